@@ -0,0 +1,253 @@
+import argparse
+import base64
+import binascii
+import hmac
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from service import GenerationError, GenerationService
+import tracing
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = int(os.getenv("API_MAX_BODY_BYTES", str(20 * 1024 * 1024)))
+_TYPE_NAMES = {str: "a string", int: "an integer", bool: "a boolean"}
+
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    """
+    JSON API over GenerationService.
+
+    POST /generate        {"resume_pdf": <base64>, "url" | "page_text", "word_limit", "fused", "regenerate"}
+                          -> {"results": [...]}
+    POST /generate/batch  {"resume_pdf": <base64>, "pages": [{"url" | "page_text"}, ...], ...}
+                          -> {"pages": [{"results": [...], "error": null}, ...]}
+    GET  /healthz, GET /metrics (this worker's Prometheus metrics)
+    """
+
+    service = None
+    token = None
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._json(200, {"status": "ok", "pid": os.getpid()})
+        elif self.path == "/metrics":
+            self._send(200, tracing.render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        routes = {"/generate": self._generate, "/generate/batch": self._generate_batch}
+        route = routes.get(self.path)
+        if route is None:
+            self._reject(404, "Not found")
+            return
+        authorization = self.headers.get("Authorization", "")
+        if self.token and not hmac.compare_digest(authorization.encode(), f"Bearer {self.token}".encode()):
+            self._reject(401, "Unauthorized")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._reject(400, "Invalid Content-Length.")
+            return
+        if length > MAX_BODY_BYTES:
+            self._reject(413, f"Request body exceeds {MAX_BODY_BYTES} bytes.")
+            return
+        try:
+            self._json(200, route(self._read_json(length)))
+        except (GenerationError, ValueError) as e:
+            self._json(400, {"error": str(e)})
+        except Exception as e:
+            logger.exception("Generation failed")
+            self._json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _read_json(self, length):
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("Expected a JSON object.")
+        return payload
+
+    @staticmethod
+    def _field(payload, name, types, default=None):
+        """``payload[name]`` if it is one of ``types`` (or missing/null: ``default``), else ValueError."""
+        value = payload.get(name)
+        if value is None:
+            return default
+        # bool is an int subclass; "word_limit": true is as wrong as "word_limit": "abc".
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise ValueError(f"{name} must be {' or '.join(_TYPE_NAMES[t] for t in types)}.")
+        return value
+
+    @classmethod
+    def _options(cls, payload):
+        resume_pdf = cls._field(payload, "resume_pdf", (str,), "")
+        try:
+            resume_pdf = base64.b64decode(resume_pdf, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("resume_pdf must be base64-encoded.")
+        word_limit = cls._field(payload, "word_limit", (int,), 100)
+        if word_limit <= 0:
+            raise ValueError("word_limit must be a positive integer.")
+        return {
+            "resume_pdf": resume_pdf,
+            "word_limit": word_limit,
+            "fused": cls._field(payload, "fused", (bool,)),
+            "regenerate": cls._field(payload, "regenerate", (bool,), False),
+        }
+
+    @classmethod
+    def _page(cls, page):
+        """The ``url`` / ``page_text`` of one page object, at least one of them set."""
+        if not isinstance(page, dict):
+            raise ValueError("must be an object with url or page_text.")
+        url = cls._field(page, "url", (str,))
+        page_text = cls._field(page, "page_text", (str,))
+        if not url and page_text is None:
+            raise ValueError("Either url or page_text is required.")
+        return {"url": url, "page_text": page_text}
+
+    def _generate(self, payload):
+        page = self._page(payload)
+        results = self.service.generate(**page, **self._options(payload))
+        return {"results": results}
+
+    def _generate_batch(self, payload):
+        pages = payload.get("pages")
+        if not isinstance(pages, list) or not pages:
+            raise ValueError("pages must be a non-empty list.")
+        checked = []
+        for i, page in enumerate(pages):
+            try:
+                checked.append(self._page(page))
+            except ValueError as e:
+                raise ValueError(f"pages[{i}]: {e}")
+        return {"pages": self.service.generate_batch(pages=checked, **self._options(payload))}
+
+    def _reject(self, status, message):
+        # Answered without reading the body: on a kept-alive connection the unread bytes
+        # would be parsed as the next request, so close it instead.
+        self.close_connection = True
+        self._json(status, {"error": message})
+
+    def _json(self, status, payload):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def preload():
+    """Import the heavy modules and load the embedding weights once, before workers fork."""
+    import chains  # noqa: F401
+    import resume  # noqa: F401
+    from embeddings import get_embedding_service
+
+    # Weights only: running inference here would start torch's thread pools, which do not survive fork.
+    get_embedding_service().model
+
+
+def _serve_worker(server):
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Each worker serves its own /metrics on the API port; METRICS_PORT would collide across workers.
+    GenerationHandler.service.warm_up()
+    server.serve_forever()
+
+
+def serve(host, port, workers):
+    """
+    Pre-fork server: the parent binds the socket and preloads the model, then forks
+    ``workers`` processes that accept on the shared socket and share the model's
+    memory copy-on-write. Dead workers are replaced.
+    """
+    server = ThreadingHTTPServer((host, port), GenerationHandler)
+    preload()
+    if workers <= 1 or not hasattr(os, "fork"):
+        GenerationHandler.service.warm_up()
+        logger.info("Serving on %s:%s (single process)", host, port)
+        server.serve_forever()
+        return
+
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _serve_worker(server)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info("Serving on %s:%s with %d workers", host, port, workers)
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %s exited; starting a replacement", pid)
+            time.sleep(0.5)
+            spawn()
+    server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless cold email generation API.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", str(os.cpu_count() or 1))))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    # Split the cores between workers instead of every worker's torch using all of them.
+    os.environ.setdefault("EMBEDDING_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, args.workers))))
+    GenerationHandler.service = GenerationService()
+    # Same variable RemoteGenerationService sends, so one setting configures both sides.
+    GenerationHandler.token = os.getenv("GENERATION_API_TOKEN")
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
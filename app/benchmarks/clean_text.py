@@ -0,0 +1,55 @@
+"""
+Check that streaming clean_text_chunks matches clean_text, then time both.
+
+    cd app && python -m benchmarks.clean_text [--cases 3000] [--seed 0]
+
+Inputs are random mixes of words, paragraph breaks, tags (including tags that span a
+blank line and "<" / ">" arriving in different chunks) and URLs, cut at random chunk
+boundaries. The script exits non-zero on the first input where the two disagree.
+"""
+import argparse
+import random
+import sys
+import time
+
+from utils import clean_text, clean_text_chunks
+
+_PIECES = (
+    "word ", "Café ", "senior engineer ", "\n\n", "\n", " \n \n ", "\t",
+    "<div\n\nclass='x'>", "<br>", "<p>", "</p>", "<", ">", "&amp; ", "-- ",
+    "http://example.com/jobs?id=1", "https://example.com/\n\nnext",
+)
+
+
+def random_case(rng, max_pieces=40, max_cuts=6):
+    text = "".join(rng.choice(_PIECES) for _ in range(rng.randint(1, max_pieces)))
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, max_cuts))))
+    return text, [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for i in range(args.cases):
+        text, chunks = random_case(rng)
+        streamed = "".join(clean_text_chunks(chunks))
+        expected = clean_text(text)
+        if streamed != expected:
+            print(f"case {i}: chunks={chunks!r}\n  clean_text_chunks: {streamed!r}\n  clean_text:        {expected!r}")
+            sys.exit(1)
+    print(f"parity: {args.cases} cases OK")
+
+    page, chunks = random_case(random.Random(args.seed), max_pieces=200_000, max_cuts=500)
+    for name, fn in (("clean_text", lambda: clean_text(page)),
+                     ("clean_text_chunks", lambda: "".join(clean_text_chunks(chunks)))):
+        start = time.perf_counter()
+        fn()
+        print(f"{name:>18}: {len(page) / (time.perf_counter() - start) / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
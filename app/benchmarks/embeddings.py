@@ -0,0 +1,74 @@
+"""
+Compare embedding backends: parity against torch and throughput in sentences/sec.
+
+    cd app && python -m benchmarks.embeddings [--backends torch onnx onnx-int8] [--sentences 512]
+
+Every non-torch backend must stay within --min-cosine (default 0.99) of the torch
+embeddings for each sentence; the script exits non-zero when one does not.
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from embedding_backends import BACKENDS, load_backend
+from embeddings import DEFAULT_EMBEDDING_MODEL
+
+_WORDS = ("senior", "python", "engineer", "distributed", "systems", "react", "frontend", "cloud",
+          "kubernetes", "data", "pipelines", "machine", "learning", "team", "lead", "remote",
+          "experience", "years", "with", "and", "building", "scalable", "apis", "customers")
+
+
+def synthetic_sentences(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 60))) for _ in range(n)]
+
+
+def row_cosine(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def throughput(backend, sentences, batch_size, repeat):
+    backend.encode(sentences[:batch_size], batch_size=batch_size)  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.encode(sentences, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+    return len(sentences) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--sentences", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    sentences = synthetic_sentences(args.sentences)
+    reference = load_backend("torch", args.model, num_threads=args.threads)
+    expected = np.asarray(reference.encode(sentences, batch_size=args.batch_size))
+
+    failed = False
+    print(f"{'backend':>10} {'sentences/s':>12} {'min cosine':>11} {'mean cosine':>12}")
+    for name in args.backends:
+        backend = reference if name == "torch" else load_backend(name, args.model, num_threads=args.threads)
+        rate = throughput(backend, sentences, args.batch_size, args.repeat)
+        cosine = row_cosine(expected, np.asarray(backend.encode(sentences, batch_size=args.batch_size)))
+        ok = cosine.min() >= args.min_cosine
+        failed |= not ok
+        print(f"{name:>10} {rate:>12.1f} {cosine.min():>11.4f} {cosine.mean():>12.4f}{'' if ok else '  FAIL'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
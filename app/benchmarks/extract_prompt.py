@@ -0,0 +1,82 @@
+"""
+Check that every posting on a careers page reaches the extract_jobs prompt.
+
+    cd app && python -m benchmarks.extract_prompt
+
+Runs the recorded careers_acme page through html_to_text, clean_text and
+Chain._extract_jobs_prompt, once as is (the page fits EXTRACT_MAX_WORDS and is
+sent whole) and once with a word budget one word short of the page, forcing section ranking,
+using a bag-of-words encoder so the check needs no model weights. Exits non-zero
+when a posting is missing from the prompt or the page is cut into short
+one-paragraph chunks.
+"""
+import os
+import re
+import sys
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import numpy as np
+
+import section_ranking
+from benchmarks.synthetic import recorded_pages
+from chains import Chain
+from fetcher import html_to_text
+from utils import clean_text
+
+ACME_ROLES = ("Backend Engineer", "Senior Frontend Engineer", "Machine Learning Engineer")
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}")
+        sys.exit(1)
+    print(f"  ok: {message}")
+
+
+class BagOfWordsEncoder:
+    """Stand-in for the embedding service: one dimension per vocabulary word."""
+
+    def __init__(self, vocabulary):
+        self.index = {word: i for i, word in enumerate(sorted(set(vocabulary)))}
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), len(self.index)), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                if word in self.index:
+                    vectors[row, self.index[word]] += 1
+        return vectors[0] if single else vectors
+
+
+def prompt_for(chain, text):
+    prompt, inputs = chain._extract_jobs_prompt(text)
+    return prompt.invoke(inputs).to_string()
+
+
+def main():
+    text = clean_text(html_to_text(recorded_pages()["careers_acme"]))
+    chain = Chain()
+
+    prompt = prompt_for(chain, text)
+    for role in ACME_ROLES:
+        check(role in prompt, f"whole page: {role!r} reaches the prompt")
+
+    words = len(text.split())
+    chunks = list(section_ranking.window_chunks(text, chunk_words=120))
+    check(all(len(chunk.split()) > 60 for chunk in chunks[:-1]),
+          f"short paragraphs are merged into windows ({[len(chunk.split()) for chunk in chunks]} words)")
+
+    encoder = BagOfWordsEncoder(re.findall(r"[a-z]+", section_ranking.JOB_POSTING_QUERY.lower()) + ["engineer"])
+    sections = section_ranking.rank_sections(text, encoder, chunk_words=120, overlap_words=20,
+                                             max_words=words - 1)
+    joined = "\n\n".join(sections)
+    check(len(sections) < len(chunks) and sum(len(section.split()) for section in sections) < words,
+          f"ranked sections stay within the word budget ({len(sections)} of {len(chunks)} windows)")
+    for role in ACME_ROLES:
+        check(role in joined, f"ranked sections: {role!r} reaches the prompt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Check PageFetcher's caching and limits against a local server, then time each path.
+
+    cd app && python -m benchmarks.fetcher [--repeat 50]
+
+Asserts that a fresh page is served from the TTL cache without a request, that a
+stale page is revalidated with If-None-Match (304, body reused) and refetched once
+it changes, that URLs differing only in tracking parameters share an entry, and
+that pages over the size cap raise PageTooLargeError whether or not the server
+sends Content-Length. Exits non-zero on the first failed check.
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.synthetic import careers_page, serve_pages
+from fetcher import PageFetcher, PageTooLargeError
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}")
+        sys.exit(1)
+    print(f"  ok: {message}")
+
+
+def check_cache(base_url, server):
+    fetcher = PageFetcher(ttl_seconds=300)
+    html = fetcher.fetch(f"{base_url}/careers")
+    fetcher.fetch(f"{base_url}/careers?utm_source=mail")
+    check(html == server.pages["careers"], "first fetch returns the page")
+    check(server.requests["careers"] == 1, "fresh page served from the TTL cache without a request")
+    check(fetcher.stats()["hits"] == 1, "tracking parameters share the cache entry")
+
+
+def check_revalidation(base_url, server):
+    fetcher = PageFetcher(ttl_seconds=0)
+    first = fetcher.fetch(f"{base_url}/careers")
+    second = fetcher.fetch(f"{base_url}/careers")
+    check(second == first and fetcher.stats()["revalidated"] == 1, "stale page revalidated with a 304")
+
+    server.pages["careers"] = careers_page(n_jobs=4, seed=1)
+    third = fetcher.fetch(f"{base_url}/careers")
+    check(third == server.pages["careers"] and fetcher.stats()["misses"] == 2, "changed page refetched")
+
+
+def check_size_cap(pages):
+    for send_length in (True, False):
+        _, base_url = serve_pages(pages, send_length=send_length)
+        fetcher = PageFetcher(max_bytes=len(pages["careers"].encode("utf-8")) - 1)
+        try:
+            fetcher.fetch(f"{base_url}/careers")
+        except PageTooLargeError:
+            raised = True
+        else:
+            raised = False
+        how = "declared in Content-Length" if send_length else "while streaming"
+        check(raised and fetcher.stats()["entries"] == 0, f"oversized page rejected ({how})")
+
+
+def time_paths(base_url, repeat):
+    for name, fetcher in (("hit", PageFetcher(ttl_seconds=300)), ("revalidated", PageFetcher(ttl_seconds=0))):
+        fetcher.fetch(f"{base_url}/careers")
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fetcher.fetch(f"{base_url}/careers")
+        print(f"{name:>12}: {(time.perf_counter() - start) / repeat * 1000:.2f} ms/fetch")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        PageFetcher().fetch(f"{base_url}/careers")
+    print(f"{'miss':>12}: {(time.perf_counter() - start) / repeat * 1000:.2f} ms/fetch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = {"careers": careers_page(n_jobs=3, seed=0)}
+    server, base_url = serve_pages(pages)
+    check_cache(base_url, server)
+    check_revalidation(base_url, server)
+    check_size_cap(pages)
+    time_paths(base_url, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Check that Chain.format_email and the streamed EmailStreamFormatter output match
+the original paragraph-by-paragraph format_email, then time both.
+
+    cd app && python -m benchmarks.format_email [--cases 3000] [--seed 0]
+
+Inputs are random mixes of words, punctuation, greetings ending in a comma and
+blank lines, cut at random chunk boundaries as a model stream would deliver them.
+The script exits non-zero on the first input where any two disagree.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from chains import EmailStreamFormatter
+
+_PIECES = (
+    "Hi Sam,", "Dear hiring team,", "I built", " the data pipeline", ".", "!", "?", ",",
+    " ", "  ", "\n", "\n\n", "\n\n\n", " \n\n ", "\t", "Best regards,", "Jane", "—", "3.5x",
+)
+
+
+def original_format_email(email_content):
+    """format_email as it was before streaming, kept here as the reference."""
+    paragraphs = [p.strip() for p in email_content.split('\n\n') if p.strip()]
+    formatted_paragraphs = []
+    for para in paragraphs:
+        para = re.sub(r'\s+', ' ', para).strip()
+        if para and not re.search(r'[.!?]$', para):
+            para += '.'
+        formatted_paragraphs.append(para)
+    return '\n\n'.join(formatted_paragraphs)
+
+
+def format_whole(text):
+    formatter = EmailStreamFormatter()
+    return formatter.feed(text) + formatter.close()
+
+
+def format_streamed(chunks):
+    formatter = EmailStreamFormatter()
+    return "".join(formatter.feed(chunk) for chunk in chunks) + formatter.close()
+
+
+def random_case(rng, max_pieces=40, max_cuts=8):
+    text = "".join(rng.choice(_PIECES) for _ in range(rng.randint(0, max_pieces)))
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, max_cuts))))
+    return text, [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for i in range(args.cases):
+        text, chunks = random_case(rng)
+        expected = original_format_email(text)
+        whole, streamed = format_whole(text), format_streamed(chunks)
+        if not expected == whole == streamed:
+            print(f"case {i}: chunks={chunks!r}\n  original: {expected!r}\n  format_email: {whole!r}\n"
+                  f"  streamed:     {streamed!r}")
+            sys.exit(1)
+    print(f"parity: {args.cases} cases OK")
+
+    text, chunks = random_case(random.Random(args.seed), max_pieces=200_000, max_cuts=20_000)
+    for name, fn in (("original", lambda: original_format_email(text)),
+                     ("format_email", lambda: format_whole(text)),
+                     ("streamed", lambda: format_streamed(chunks))):
+        start = time.perf_counter()
+        fn()
+        print(f"{name:>14}: {len(text) / (time.perf_counter() - start) / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
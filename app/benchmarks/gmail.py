@@ -0,0 +1,182 @@
+"""
+Check GmailSender against a local mock of the Gmail API.
+
+    cd app && python -m benchmarks.gmail [--emails 7] [--batch-size 3]
+
+Builds the sender from the bundled discovery document (asserting that no request
+leaves the mock), checks the MIME message build_message produces, sends one email
+and then a batch in which some recipients are rejected, asserting the
+(message_id, error) pair of each email and the number of batch round trips.
+Exits non-zero on the first failed check.
+"""
+import argparse
+import base64
+import email
+import email.policy
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from benchmarks.synthetic import resume_pdf
+from email_services import GmailSender, build_message
+
+SEND_PATH = "/gmail/v1/users/me/messages/send"
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}")
+        sys.exit(1)
+    print(f"  ok: {message}")
+
+
+def parse_raw(message):
+    return email.message_from_bytes(base64.urlsafe_b64decode(message["raw"]), policy=email.policy.default)
+
+
+class _GmailHandler(BaseHTTPRequestHandler):
+    """Answers messages.send (alone or inside a batch); recipients containing "reject" get a 400."""
+
+    protocol_version = "HTTP/1.1"
+    sent = None
+    batches = None
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.split("?")[0] == SEND_PATH:
+            status, payload = self._send_message(body)
+            self._reply(status, "application/json", json.dumps(payload).encode())
+        elif self.path == "/batch":
+            self._batch(body)
+        else:
+            self._reply(404, "application/json", b'{"error": {"code": 404}}')
+
+    def _send_message(self, body):
+        message = parse_raw(json.loads(body))
+        if "reject" in message["To"]:
+            return 400, {"error": {"code": 400, "message": f"Invalid To header: {message['To']}"}}
+        with self.lock:
+            self.sent.append(message)
+            return 200, {"id": f"msg-{len(self.sent)}", "labelIds": ["SENT"]}
+
+    def _batch(self, body):
+        with self.lock:
+            self.batches.append(body)
+        request = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body, policy=email.policy.default)
+        boundary = "batch_mock_boundary"
+        parts = []
+        for part in request.iter_parts():
+            # googleapiclient separates the embedded request's lines with bare "\n".
+            head, _, inner_body = part.get_payload(decode=True).replace(b"\r\n", b"\n").partition(b"\n\n")
+            method, path = head.split(b" ")[:2]
+            if method != b"POST" or path.decode().split("?")[0] != SEND_PATH:
+                status, payload = 404, {"error": {"code": 404}}
+            else:
+                status, payload = self._send_message(inner_body)
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        self._reply(200, f"multipart/mixed; boundary={boundary}", "".join(parts + [f"--{boundary}--\r\n"]).encode())
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_gmail():
+    """Mock Gmail API on http://127.0.0.1:<port>/; returns (server, base_url)."""
+    handler = type("GmailHandler", (_GmailHandler,), {"sent": [], "batches": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.sent, server.batches = handler.sent, handler.batches
+    threading.Thread(target=server.serve_forever, name="gmail-mock", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+class _RecordingHttp(httplib2.Http):
+    """Unauthenticated transport that records every URI requested."""
+
+    def __init__(self):
+        super().__init__()
+        self.uris = []
+
+    def request(self, uri, *args, **kwargs):
+        self.uris.append(uri)
+        return super().request(uri, *args, **kwargs)
+
+
+def check_build_message(pdf):
+    message = parse_raw(build_message("me@example.com", "hr@example.com", "Application for Data Engineer",
+                                      "Hello,\nPlease find my resume attached.", pdf, "jane.pdf"))
+    check((message["From"], message["To"], message["Subject"]) ==
+          ("me@example.com", "hr@example.com", "Application for Data Engineer"), "headers set")
+    text, attachment = list(message.iter_parts())
+    check(text.get_content_type() == "text/plain" and "Please find my resume" in text.get_content(),
+          "plain-text body")
+    check(attachment.get_content_type() == "application/pdf" and attachment.get_filename() == "jane.pdf"
+          and attachment.get_content() == pdf, "PDF attachment round-trips")
+    bare = parse_raw(build_message("me@example.com", "hr@example.com", "Hi", "Body"))
+    check(len(list(bare.iter_parts())) == 1, "no attachment part without an attachment")
+
+
+def check_sender(base_url, server, pdf, n_emails, batch_size):
+    http = _RecordingHttp()
+    sender = GmailSender(sender_email="me@example.com", api_endpoint=base_url, http=http)
+    check(not http.uris, "service built from the bundled discovery document without a request")
+
+    message_id = sender.send("hr@example.com", "Subject", "Body", pdf, "resume.pdf")
+    check(message_id == "msg-1" and server.sent[-1]["To"] == "hr@example.com", "send returns the message id")
+
+    emails = [{"to": f"{'reject' if i % 3 == 1 else 'hr'}{i}@example.com", "subject": f"Role {i}",
+               "body": f"Body {i}", "attachment": pdf} for i in range(n_emails)]
+    emails[0]["sender_email"] = "other@example.com"
+    results = sender.send_batch(emails, batch_size=batch_size)
+    check(len(server.batches) == -(-n_emails // batch_size),
+          f"{n_emails} emails sent in {len(server.batches)} batch round trips of up to {batch_size}")
+    check(len(results) == n_emails and all((message_id is None) != (error is None) for message_id, error in results),
+          "one (message_id, error) pair per email with exactly one set")
+    for i, (message_id, error) in enumerate(results):
+        if i % 3 == 1:
+            ok = isinstance(error, HttpError) and error.resp.status == 400
+        else:
+            # The mock numbers messages in the order it accepted them: msg-N is server.sent[N - 1].
+            ok = message_id is not None and server.sent[int(message_id[len("msg-"):]) - 1]["Subject"] == f"Role {i}"
+        if not ok:
+            check(False, f"email {i} maps to its own result, got {message_id!r} / {error!r}")
+    check(True, "rejected recipients map to HttpError 400, the rest to their own message ids")
+    by_subject = {message["Subject"]: message for message in server.sent}
+    check(by_subject["Role 0"]["From"] == "other@example.com" and by_subject["Role 2"]["From"] == "me@example.com",
+          "per-email sender_email overrides the default")
+    mock_host = urlsplit(base_url).netloc
+    check(all(urlsplit(uri).netloc == mock_host for uri in http.uris), "every request went to api_endpoint")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf = resume_pdf(n_pages=1)
+    check_build_message(pdf)
+    server, base_url = serve_gmail()
+    check_sender(base_url, server, pdf, args.emails, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+End-to-end offline benchmark of the generation pipeline.
+
+    cd app && python -m benchmarks.pipeline [--iterations 20] [--llm-latency 0.05]
+    cd app && python -m benchmarks.pipeline --write-baseline benchmarks/pipeline_baseline.json
+    cd app && python -m benchmarks.pipeline --baseline benchmarks/pipeline_baseline.json
+
+Each iteration runs the real stages (page fetch from a local HTTP server, clean_text,
+extract_jobs, load_resume, analyze_fit, generate_subject_line, write_mail, format_email)
+against the recorded pages in benchmarks/fixtures plus synthetic ones, a fresh
+synthetic PDF resume, and the deterministic fake LLM. Embedding and resume caches are
+disabled unless --warm-caches is given, so every iteration does the full work.
+
+Reports per-stage p50/p95/p99, peak RSS and embeddings/sec, and exits non-zero when
+a stage's p95, the peak RSS or the embedding throughput is more than --tolerance
+worse than the baseline.
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.synthetic import careers_page, recorded_pages, resume_pdf, serve_pages
+
+STAGES = ("fetch", "clean_text", "extract_jobs", "load_resume", "analyze_fit",
+          "generate_subject_line", "write_mail", "format_email", "total")
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class EncodeCounter:
+    """Wraps the embedding service's model call to count sentences and time spent encoding."""
+
+    def __init__(self, service):
+        self.sentences = 0
+        self.seconds = 0.0
+        self._encode = service._encode
+        service._encode = self
+
+    def __call__(self, texts, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._encode(texts, *args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.sentences += 1 if isinstance(texts, str) else len(texts)
+
+    @property
+    def per_second(self):
+        return self.sentences / self.seconds if self.seconds else 0.0
+
+
+def run(args):
+    from chains import Chain
+    from embeddings import get_embedding_service
+    from fake_llm import FakeChatModel
+    from fetcher import PageFetcher
+    from resume import Resume
+    from utils import clean_text
+
+    pages = recorded_pages()
+    for n_jobs, filler in ((1, 10), (5, 200), (20, 2000)):
+        pages[f"synthetic_{n_jobs}x{filler}"] = careers_page(n_jobs, filler, seed=n_jobs)
+    server, base_url = serve_pages(pages)
+
+    llm = FakeChatModel(latency=args.llm_latency, jitter=args.llm_jitter, seed=0)
+    chain = Chain(llm=llm, cache_policy="bypass")
+    fetcher = PageFetcher(ttl_seconds=0)
+    service = get_embedding_service()
+    service.warm_up()
+    counter = EncodeCounter(service)
+
+    timings = defaultdict(list)
+
+    def timed(stage, fn, *fn_args):
+        start = time.perf_counter()
+        result = fn(*fn_args)
+        timings[stage].append(time.perf_counter() - start)
+        return result
+
+    names = sorted(pages)
+    try:
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            html = timed("fetch", fetcher.fetch_text, f"{base_url}/{names[i % len(names)]}")
+            data = timed("clean_text", clean_text, html)
+            jobs = timed("extract_jobs", chain.extract_jobs, data)
+            job = jobs[0] if isinstance(jobs, list) else jobs
+
+            resume = Resume()
+            pdf = io.BytesIO(resume_pdf(args.resume_pages, seed=i if not args.warm_caches else 0))
+            if timed("load_resume", resume.load_resume, pdf) is None:
+                raise RuntimeError("load_resume failed on a synthetic resume")
+
+            analysis = timed("analyze_fit", chain.analyze_fit, job, resume.get_all_sections_text())
+            timed("generate_subject_line", chain.generate_subject_line, analysis, job)
+            # write_mail = model call + format_email; time them apart to see the formatter.
+            prompt, inputs = chain._email_prompt(job, resume, args.word_limit, analysis)
+            raw = timed("write_mail", chain._invoke, "write_mail", prompt, inputs, lambda res: res)
+            timed("format_email", chain.format_email, raw.content)
+            timings["total"].append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+
+    report = {"stages": {}, "peak_rss_mb": round(peak_rss_mb(), 1),
+              "embeddings_per_sec": round(counter.per_second, 1), "iterations": args.iterations}
+    for stage in STAGES:
+        ordered = sorted(timings[stage])
+        report["stages"][stage] = {f"p{p}": round(percentile(ordered, p) * 1000, 3) for p in (50, 95, 99)}
+    return report
+
+
+def compare(report, baseline, tolerance):
+    failures = []
+    for stage, stats in baseline["stages"].items():
+        current = report["stages"].get(stage, {}).get("p95")
+        # Sub-millisecond stages are dominated by noise; give them an absolute floor.
+        if current is not None and current > max(stats["p95"] * (1 + tolerance), stats["p95"] + 1.0):
+            failures.append(f"{stage} p95 {current:.1f}ms vs baseline {stats['p95']:.1f}ms")
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        failures.append(f"peak RSS {report['peak_rss_mb']:.0f}MB vs baseline {baseline['peak_rss_mb']:.0f}MB")
+    if report["embeddings_per_sec"] < baseline["embeddings_per_sec"] * (1 - tolerance):
+        failures.append(f"{report['embeddings_per_sec']:.0f} embeddings/sec vs baseline "
+                        f"{baseline['embeddings_per_sec']:.0f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--resume-pages", type=int, default=2)
+    parser.add_argument("--word-limit", type=int, default=100)
+    parser.add_argument("--warm-caches", action="store_true", help="keep the embedding and resume caches on")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--write-baseline", metavar="PATH")
+    args = parser.parse_args()
+
+    if not args.warm_caches:
+        os.environ["EMBEDDING_CACHE_SIZE"] = "0"
+        os.environ.pop("EMBEDDING_CACHE_DIR", None)
+        os.environ["RESUME_CACHE_SIZE"] = "0"
+        os.environ.pop("RESUME_CACHE_DIR", None)
+
+    report = run(args)
+
+    print(f"{'stage':>22} {'p50':>9} {'p95':>9} {'p99':>9}  (ms, {args.iterations} iterations)")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:>22} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}")
+    print(f"peak RSS: {report['peak_rss_mb']:.0f} MB   embeddings/sec: {report['embeddings_per_sec']:.0f}")
+
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures = compare(report, json.load(f), args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
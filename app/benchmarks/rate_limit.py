@@ -0,0 +1,109 @@
+"""
+Check that RateLimiter stays within its limits under concurrent acquires, on every backend.
+
+    cd app && python -m benchmarks.rate_limit [--threads 32]
+
+Starts many threads at once on one user against the memory, SQLite and Redis
+(on FakeRedis) backends, asserting that exactly ``daily_limit`` acquires are
+allowed without a cooldown and exactly one with it, that refunds give back the
+quota and only their own cooldown, and that the cooldown and the day roll over
+with the clock. Exits non-zero on the first failed check.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limit import FakeRedis, MemoryBackend, RateLimiter, RedisBackend, SQLiteBackend, seconds_until_next_day
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}")
+        sys.exit(1)
+    print(f"  ok: {message}")
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def acquire_all(limiter, user, threads):
+    """Acquire for ``user`` from ``threads`` threads released together."""
+    barrier = threading.Barrier(threads)
+
+    def run(_):
+        barrier.wait()
+        return limiter.acquire(user)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(run, range(threads)))
+
+
+def check_backend(name, make_backend, threads):
+    print(f"{name}:")
+    # A fixed clock: every concurrent acquire sees the same now.
+    clock = Clock(time.time() // 86400 * 86400 + 43200.5)
+
+    backend = make_backend(clock)
+    limiter = RateLimiter(backend, cooldown_seconds=0, daily_limit=5, clock=clock)
+    decisions = acquire_all(limiter, "alice", threads)
+    allowed = [d for d in decisions if d.allowed]
+    check(len(allowed) == 5 and sorted(d.used for d in allowed) == [1, 2, 3, 4, 5],
+          f"{threads} concurrent acquires without cooldown: {len(allowed)} allowed of a limit of 5")
+    check(all(d.reason == "quota" for d in decisions if not d.allowed) and limiter.remaining("alice") == 0,
+          "the rest are refused on quota")
+
+    limiter.refund("alice", allowed[0])
+    check(limiter.remaining("alice") == 1 and limiter.acquire("alice").allowed, "a refund gives back one generation")
+
+    clock.now += seconds_until_next_day(clock.now)
+    check(limiter.acquire("alice").allowed and limiter.remaining("alice") == 4, "the quota resets the next UTC day")
+
+    backend = make_backend(clock)
+    limiter = RateLimiter(backend, cooldown_seconds=60, daily_limit=5, clock=clock)
+    decisions = acquire_all(limiter, "bob", threads)
+    allowed = [d for d in decisions if d.allowed]
+    refused = [d for d in decisions if not d.allowed]
+    check(len(allowed) == 1 and limiter.remaining("bob") == 4,
+          f"{threads} concurrent acquires with a 60 s cooldown: {len(allowed)} allowed")
+    check(all(d.reason == "cooldown" and 0 < d.retry_after <= 60 for d in refused), "the rest wait out the cooldown")
+
+    first = allowed[0]
+    limiter.refund("bob", first)
+    check(limiter.remaining("bob") == 5, "a refund gives back the quota")
+    clock.now += 1
+    second = limiter.acquire("bob")
+    check(second.allowed, "a refund lifts its own cooldown")
+    limiter.refund("bob", first)
+    check(not limiter.acquire("bob").allowed, "a stale refund leaves a later acquire's cooldown in place")
+
+    clock.now += 61
+    check(limiter.acquire("bob").allowed, "allowed again once the cooldown has passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = (os.path.join(directory, f"rate_limit-{i}.sqlite3") for i in range(2))
+        backends = (
+            ("memory", lambda clock: MemoryBackend()),
+            ("sqlite", lambda clock: SQLiteBackend(next(paths))),
+            ("fake-redis", lambda clock: RedisBackend(FakeRedis(clock))),
+        )
+        for name, make_backend in backends:
+            check_backend(name, make_backend, args.threads)
+
+
+if __name__ == "__main__":
+    main()
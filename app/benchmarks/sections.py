@@ -0,0 +1,77 @@
+"""
+Benchmark Resume section splitting on large synthetic resumes.
+
+    cd app && python -m benchmarks.sections [--lines 20000] [--repeat 5]
+
+Compares the single-pass compiled matcher against the previous keyword scan.
+"""
+import argparse
+import random
+import re
+import time
+
+from resume import parse_resume_sections, SECTION_SYNONYMS
+
+_WORDS = ("built", "scaled", "python", "service", "team", "latency", "data", "pipeline",
+          "react", "cloud", "migrated", "api", "customers", "reduced", "costs", "led")
+
+
+def synthetic_resume(n_lines, seed=0):
+    rng = random.Random(seed)
+    headers = [synonym for synonyms in SECTION_SYNONYMS.values() for synonym in synonyms]
+    lines = ["Jane Doe", "jane@example.com"]
+    while len(lines) < n_lines:
+        if rng.random() < 0.05:
+            header = rng.choice(headers)
+            lines.append(header.upper() if rng.random() < 0.5 else header + ":")
+        else:
+            lines.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 14))))
+    return "\n".join(lines)
+
+
+def keyword_scan(text):
+    """The previous implementation, kept here as the baseline."""
+    sections = {"Personal Information": "", "Summary": "", "Skills": [], "Experience": [],
+                "Education": [], "Projects": [], "Certifications": [], "Links": []}
+    current_section = "Personal Information"
+    for line in text.split('\n'):
+        line = line.strip()
+        lower_line = line.lower()
+        if any(keyword.lower() in lower_line for keyword in sections.keys()):
+            current_section = next((k for k in sections.keys() if k.lower() in lower_line), current_section)
+        elif line:
+            if current_section == "Skills":
+                sections[current_section].extend(re.split(r'[,;]', line))
+            elif isinstance(sections[current_section], list):
+                sections[current_section].append(line)
+            else:
+                sections[current_section] += line + "\n"
+    sections["Skills"] = [skill.strip() for skill in sections["Skills"] if skill.strip()]
+    return {k: v for k, v in sections.items() if v}
+
+
+def best_of(fn, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lines':>8} {'keyword scan':>14} {'compiled':>10} {'speedup':>8}")
+    for n_lines in args.lines:
+        text = synthetic_resume(n_lines)
+        baseline = best_of(keyword_scan, text, args.repeat)
+        compiled = best_of(parse_resume_sections, text, args.repeat)
+        print(f"{n_lines:>8} {baseline * 1000:>12.2f}ms {compiled * 1000:>8.2f}ms {baseline / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
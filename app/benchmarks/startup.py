@@ -0,0 +1,109 @@
+"""
+Measure the cold-start import cost of the Streamlit entry point with ``python -X importtime``.
+
+    cd app && python -m benchmarks.startup [--repeat 5] [--max-ms 1500]
+    cd app && python -m benchmarks.startup --write-baseline benchmarks/startup_baseline.json
+    cd app && python -m benchmarks.startup --baseline benchmarks/startup_baseline.json
+
+Imports exactly the modules ``main.py`` imports at module level, each in a fresh
+interpreter, and exits non-zero when a heavy dependency is loaded eagerly, when the
+best total exceeds --max-ms, or when it regresses more than --tolerance against a
+baseline.
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only be imported on first use or by the warm-up thread, never by the login page.
+DEFERRED_MODULES = ("torch", "sentence_transformers", "onnxruntime", "langchain_google_genai",
+                    "googleapiclient", "PyPDF2", "chains", "resume", "email_services")
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)')
+
+
+def entry_imports(path):
+    """Top-level modules imported at module level by ``path`` (including inside try blocks)."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules.append(node.module)
+            elif isinstance(node, ast.Try):
+                visit(node.body)
+
+    visit(tree.body)
+    return list(dict.fromkeys(modules))
+
+
+def measure(modules):
+    """Import ``modules`` in a fresh interpreter; return (total_us, {module: cumulative_us}, loaded)."""
+    code = "".join(f"import {name}\n" for name in modules)
+    code += "import sys, json\nprint(json.dumps(sorted(sys.modules)))\n"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=APP_DIR, capture_output=True, text=True)
+    if proc.returncode:
+        raise SystemExit(f"importing the entry point failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    per_module = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match and not match.group(3):  # top-level entries only; nested ones are included
+            per_module[match.group(4)] = int(match.group(2))
+    loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return sum(per_module.values()), per_module, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entry", default=os.path.join(APP_DIR, "main.py"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=float(os.getenv("STARTUP_MAX_MS", "0")) or None)
+    parser.add_argument("--baseline", help="JSON file written by --write-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline")
+    parser.add_argument("--write-baseline", metavar="PATH")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    modules = entry_imports(args.entry)
+    runs = [measure(modules) for _ in range(args.repeat)]
+    total_us, per_module, loaded = min(runs, key=lambda run: run[0])
+    total_ms = total_us / 1000
+
+    print(f"entry point: {os.path.relpath(args.entry, APP_DIR)} ({len(modules)} imports, best of {args.repeat})")
+    for name, us in sorted(per_module.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:>9.1f}ms  {name}")
+    print(f"  {total_ms:>9.1f}ms  total")
+
+    failures = []
+    eager = sorted(name for name in DEFERRED_MODULES if name in loaded)
+    if eager:
+        failures.append(f"deferred modules imported at start-up: {', '.join(eager)}")
+    if args.max_ms and total_ms > args.max_ms:
+        failures.append(f"start-up imports took {total_ms:.1f}ms; budget is {args.max_ms:.1f}ms")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_ms = json.load(f)["total_ms"]
+        if total_ms > baseline_ms * (1 + args.tolerance):
+            failures.append(f"start-up imports took {total_ms:.1f}ms; baseline is {baseline_ms:.1f}ms "
+                            f"(+{args.tolerance:.0%} allowed)")
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            json.dump({"total_ms": round(total_ms, 1), "modules": modules}, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
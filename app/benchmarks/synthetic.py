@@ -0,0 +1,139 @@
+"""
+Deterministic inputs for the benchmarks: careers pages, PDF resumes and a local HTTP server.
+"""
+import hashlib
+import os
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_WORDS = ("built", "scaled", "python", "service", "team", "latency", "data", "pipeline",
+          "react", "cloud", "migrated", "api", "customers", "reduced", "costs", "led",
+          "kubernetes", "postgres", "observability", "platform", "mentored", "shipped")
+_ROLES = ("Backend Engineer", "Frontend Engineer", "Data Engineer", "Site Reliability Engineer",
+          "Machine Learning Engineer", "Product Designer", "Engineering Manager")
+
+
+def _sentence(rng, low=6, high=18):
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(low, high)))
+
+
+def recorded_pages():
+    """{name: html} for every recorded page in benchmarks/fixtures."""
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+                pages[name[:-len(".html")]] = f.read()
+    return pages
+
+
+def careers_page(n_jobs=3, filler_paragraphs=20, seed=0):
+    """A careers page with ``n_jobs`` postings buried in navigation and marketing filler."""
+    rng = random.Random(seed)
+    parts = ["<html><head><title>Careers</title><script>var tracking = 1;</script></head><body>",
+             "<nav>" + " ".join(f"<a href='/p{i}'>Link {i}</a>" for i in range(30)) + "</nav>"]
+    job_slots = {round(j * filler_paragraphs / max(n_jobs, 1)) for j in range(n_jobs)}
+    for i in range(max(filler_paragraphs, n_jobs)):
+        if i < filler_paragraphs:
+            parts.append(f"<p>{_sentence(rng, 20, 60)}</p>")
+        if i in job_slots or i >= filler_paragraphs:
+            parts.append(
+                f"<article><h3>{rng.choice(_ROLES)}</h3><p>{rng.randint(1, 8)}+ years of experience.</p>"
+                f"<ul>{''.join(f'<li>{_sentence(rng)}</li>' for _ in range(5))}</ul>"
+                f"<p>Requirements: {', '.join(rng.sample(_WORDS, 6))}.</p></article>"
+            )
+    parts.append("<footer>© Example Inc · Imprint · Privacy</footer></body></html>")
+    return "\n".join(parts)
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages):
+    """Minimal valid PDF with one Helvetica text line per entry of each page's line list."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font_id = 3 + 2 * len(pages)
+    for i, lines in enumerate(pages):
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>")
+        body = "BT /F1 10 Tf 14 TL 50 750 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        objs.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objs):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+def resume_pdf(n_pages=2, seed=0, lines_per_page=50):
+    """A synthetic resume PDF with the section headers parse_resume_sections looks for."""
+    rng = random.Random(seed)
+    headers = ["SUMMARY", "SKILLS", "EXPERIENCE", "PROJECTS", "EDUCATION", "CERTIFICATIONS"]
+    lines = [f"Candidate {seed}", f"candidate{seed}@example.com", "https://github.com/example"]
+    while len(lines) < n_pages * lines_per_page:
+        if rng.random() < 0.08:
+            lines.append(rng.choice(headers))
+        elif lines[-1] == "SKILLS":
+            lines.append(", ".join(rng.sample(_WORDS, 8)))
+        else:
+            lines.append(_sentence(rng))
+    return make_pdf([lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    pages = {}
+    requests = None
+    send_length = True
+
+    def do_GET(self):
+        name = self.path.strip("/")
+        self.requests[name] = self.requests.get(name, 0) + 1
+        html = self.pages.get(name)
+        if html is None:
+            self.send_error(404)
+            return
+        body = html.encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Mon, 05 Jan 2026 00:00:00 GMT")
+        if self.send_length:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_pages(pages, send_length=True):
+    """
+    Serve ``{name: html}`` at http://127.0.0.1:<port>/<name>; returns (server, base_url).
+
+    Responses carry an ETag and answer a matching If-None-Match with 304. Edits to
+    ``server.pages`` are served from the next request on, and ``server.requests`` counts
+    GETs per name. With ``send_length=False`` bodies are sent without Content-Length.
+    """
+    handler = type("PageHandler", (_Handler,), {"pages": dict(pages), "requests": {}, "send_length": send_length})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.pages, server.requests = handler.pages, handler.requests
+    threading.Thread(target=server.serve_forever, name="benchmark-http", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -1,3 +1,11 @@
+import argparse
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 
 # Create a list of dictionaries from the data
@@ -63,8 +71,204 @@ data = [
     {'Company Name': 'Unstop', 'Email ID': 'isha@unstop.com, srishti@unstop.com'}
 ]
 
-# Create a Pandas DataFrame from the list of dictionaries
-df = pd.DataFrame(data)
 
-# Print the DataFrame
-print(df)
\ No newline at end of file
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_ADDRESS_SPLIT_RE = re.compile(r"[,;\s]+")
+
+
+def load_contacts(path=None):
+    """Read a contacts CSV (``Company Name``, ``Email ID`` and optional ``URL`` / ``Role``), or the built-in list."""
+    if path:
+        return pd.read_csv(path, dtype=str).fillna("")
+    return pd.DataFrame(data)
+
+
+def normalize_contacts(df):
+    """
+    One row per valid address: multi-address cells are split, addresses are
+    lower-cased and validated, and duplicates are dropped (first occurrence wins).
+    """
+    df = df.copy()
+    for column in ("URL", "Role"):
+        if column not in df.columns:
+            df[column] = ""
+    df["Company Name"] = df["Company Name"].astype(str).str.strip()
+    df["Email ID"] = df["Email ID"].astype(str).map(
+        lambda cell: [a.strip().lower() for a in _ADDRESS_SPLIT_RE.split(cell) if a.strip()]
+    )
+    df = df.explode("Email ID").dropna(subset=["Email ID"])
+    df = df[df["Email ID"].str.match(EMAIL_RE)]
+    df = df.drop_duplicates(subset=["Email ID"], keep="first")
+    return df.reset_index(drop=True)
+
+
+def _campaign_key(row):
+    # Addresses at the same company (and posting) share one generated email.
+    return f"{row['Company Name'].lower()}|{row['URL'].strip()}|{row['Role'].strip().lower()}"
+
+
+def _load_checkpoint(path):
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a partially written last line from a crash
+                done[record["key"]] = record
+    return done
+
+
+def _match_role(jobs, role):
+    """The posting whose title is ``role`` (case-insensitive), else one whose title contains it or vice versa."""
+    wanted = role.strip().lower()
+    titles = [(str(job.get("role", "")).strip().lower(), job) for job in jobs]
+    for title, job in titles:
+        if title == wanted:
+            return job
+    for title, job in titles:
+        if title and (wanted in title or title in wanted):
+            return job
+    return None
+
+
+def _job_for(row, service, default_role):
+    url = row["URL"].strip()
+    role = row["Role"].strip()
+    if url:
+        from service import GenerationError
+
+        try:
+            jobs = service.extract_jobs(url)
+        except GenerationError:
+            jobs = []
+        # A row without a role takes the page's first posting; otherwise only its own role will do.
+        job = _match_role(jobs, role) if role else (jobs[0] if jobs else None)
+        if job is not None:
+            return job
+    role = role or default_role
+    return {
+        "company_name": row["Company Name"],
+        "role": role,
+        "experience": "Not specified",
+        "skills": "Not specified",
+        "description": f"Open {role} opportunities at {row['Company Name']}",
+    }
+
+
+def run_campaign(contacts, chain, resume, word_limit=100, checkpoint_path="campaign.jsonl",
+                 max_workers=4, default_role="Software Engineer", fused=None):
+    """
+    Generate one email per company/posting for every contact row on a worker pool.
+
+    Each finished group is appended to ``checkpoint_path`` (JSONL) as soon as it
+    completes, so a crashed run picks up where it stopped. Returns all records.
+    """
+    from pipeline import generate_for_job
+    from service import GenerationService
+
+    # Groups on the same careers page share one fetch + extraction through the service's
+    # single-flight cache; _job_for then picks each group's own posting by role.
+    service = GenerationService(chain=chain)
+    contacts = normalize_contacts(contacts)
+    groups = {}
+    for _, row in contacts.iterrows():
+        groups.setdefault(_campaign_key(row), []).append(row)
+
+    done = _load_checkpoint(checkpoint_path)
+    todo = [key for key in groups if key not in done]
+    print(f"{len(groups)} groups, {len(done)} already done, {len(todo)} to generate.")
+
+    resume_sections = resume.get_all_sections_text()
+    write_lock = threading.Lock()
+
+    def generate(key):
+        rows = groups[key]
+        try:
+            job = _job_for(rows[0], service, default_role)
+            result = generate_for_job(chain, job, resume, word_limit, resume_sections, fused)
+            record = {
+                "key": key,
+                "company": rows[0]["Company Name"],
+                "recipients": [r["Email ID"] for r in rows],
+                "role": job.get("role", ""),
+                "subject": result["subject"],
+                "email_body": result["email_body"],
+                "mode": result.get("mode"),
+                "error": None,
+            }
+        except Exception as e:
+            record = {"key": key, "company": rows[0]["Company Name"], "recipients": [r["Email ID"] for r in rows],
+                      "role": "", "subject": "", "email_body": "", "mode": None, "error": f"{type(e).__name__}: {e}"}
+        if record["error"] is None:
+            with write_lock, open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="campaign") as executor:
+        futures = [executor.submit(generate, key) for key in todo]
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            done[record["key"]] = record
+            status = record["error"] or "ok"
+            print(f"[{i}/{len(todo)}] {record['company']}: {status}")
+
+    return [done[key] for key in groups if key in done]
+
+
+def write_results(records, csv_path=None, jsonl_path=None):
+    """One output row per recipient address."""
+    rows = [
+        {
+            "Company Name": record["company"],
+            "Email ID": address,
+            "Role": record["role"],
+            "Subject": record["subject"],
+            "Body": record["email_body"],
+            "Error": record["error"] or "",
+        }
+        for record in records
+        for address in record["recipients"]
+    ]
+    if csv_path:
+        pd.DataFrame(rows).to_csv(csv_path, index=False)
+    if jsonl_path:
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate cold emails for a list of contacts.")
+    parser.add_argument("--resume", required=True, help="Path to the candidate's PDF resume.")
+    parser.add_argument("--contacts", help="CSV with 'Company Name' and 'Email ID' columns (defaults to the built-in list).")
+    parser.add_argument("--role", default="Software Engineer", help="Role to pitch when a row has no URL or Role.")
+    parser.add_argument("--word-limit", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default="campaign.jsonl")
+    parser.add_argument("--csv", default="campaign.csv")
+    parser.add_argument("--jsonl")
+    parser.add_argument("--fused", action="store_true", help="Use the single-call generation mode.")
+    args = parser.parse_args()
+
+    from chains import Chain
+    from resume import Resume
+
+    resume = Resume()
+    with open(args.resume, "rb") as f:
+        if resume.load_resume(io.BytesIO(f.read())) is None:
+            raise SystemExit("Could not parse the resume.")
+
+    records = run_campaign(
+        load_contacts(args.contacts), Chain(), resume,
+        word_limit=args.word_limit, checkpoint_path=args.checkpoint,
+        max_workers=args.workers, default_role=args.role, fused=args.fused or None,
+    )
+    write_results(records, csv_path=args.csv, jsonl_path=args.jsonl)
+    print(f"Wrote {len(records)} generated emails to {args.csv}.")
+
+
+if __name__ == "__main__":
+    main()
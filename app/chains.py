@@ -1,14 +1,21 @@
+import asyncio
+import copy
 import os
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
-import streamlit as st
+from langchain_core.messages import AIMessage
+import logging
 from utils import print_wrapped
 import re
-from sentence_transformers import SentenceTransformer
-import torch
+from embeddings import get_embedding_service
+from section_ranking import rank_sections
+from llm_runtime import get_llm_runtime
+from llm_cache import get_llm_cache, response_key
+import tracing
+
+logger = logging.getLogger(__name__)
 
 # Set USER_AGENT
 os.environ['USER_AGENT'] = os.getenv('USER_AGENT', 'ColdEmailGenerator/1.0')
@@ -21,34 +28,207 @@ def _escape_braces_for_prompt_template(s: str) -> str:
     return s.replace("{", "{{").replace("}", "}}")
 
 
-class Chain:
+def _usage(res):
+    """Token counts reported by the model, as span attributes."""
+    usage = getattr(res, "usage_metadata", None) or {}
+    return {k: usage[k] for k in ("input_tokens", "output_tokens") if k in usage}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+# Appended when a streamed email fails after part of it was shown, so it is not mistaken for a finished one.
+TRUNCATED_NOTICE = ("\n\n[This email was cut off by an error while it was being written. "
+                    "Regenerate it or finish it by hand before sending.]")
+
+
+class EmailStreamFormatter:
+    """
+    Incremental version of ``Chain.format_email``.
+
+    Paragraphs are separated by blank lines; whitespace inside a paragraph is
+    collapsed and a period is added when a paragraph ends without terminal
+    punctuation. Text is emitted as soon as it can no longer change, so callers
+    can render tokens as they arrive.
+    """
+
+    _WHITESPACE_RE = re.compile(r'\s+')
+    _TERMINAL = ('.', '!', '?')
+
     def __init__(self):
+        self._pending = ""
+        self._in_paragraph = False
+        self._emitted_paragraph = False
+        self._last_char = ""
+
+    def feed(self, text):
+        """Consume a chunk of raw model output and return the text that is now final."""
+        pending = self._pending + text
+        out = []
+        start = 0
+        while True:
+            boundary = pending.find('\n\n', start)
+            if boundary < 0:
+                break
+            out.append(self._emit(pending[start:boundary].rstrip()))
+            out.append(self._end_paragraph())
+            start = boundary + 2
+        # Trailing whitespace is held back: it may collapse or turn into a paragraph break.
+        rest = pending[start:]
+        stripped = rest.rstrip()
+        out.append(self._emit(stripped))
+        self._pending = rest[len(stripped):]
+        return "".join(out)
+
+    def close(self):
+        """Flush the final paragraph."""
+        out = self._emit(self._pending.rstrip()) + self._end_paragraph()
+        self._pending = ""
+        return out
+
+    def _emit(self, segment):
+        text = self._WHITESPACE_RE.sub(' ', segment)
+        if not self._in_paragraph:
+            text = text.lstrip()
+            if not text:
+                return ""
+            if self._emitted_paragraph:
+                text = '\n\n' + text
+            self._in_paragraph = True
+            self._emitted_paragraph = True
+        if text:
+            self._last_char = text[-1]
+        return text
+
+    def _end_paragraph(self):
+        if not self._in_paragraph:
+            return ""
+        self._in_paragraph = False
+        return "" if self._last_char in self._TERMINAL else "."
+
+
+class Chain:
+    # "use": read and write the response cache; "refresh": skip reads but store the new
+    # response; "bypass": ignore the cache; "replay": serve only recorded responses.
+    CACHE_POLICIES = ("use", "refresh", "bypass", "replay")
+
+    def __init__(self, llm=None, cache_policy=None):
         # gemini-1.5-flash / gemini-1.5-pro are shut down on the Gemini API; use 2.x or newer (see ai.google.dev changelog).
         _model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-        self.llm = ChatGoogleGenerativeAI(
-            model=_model,
-            temperature=0.5,
-            api_key=os.getenv("GEMINI_API_KEY"),
-            max_output_tokens=3000,
+        if llm is None and os.getenv("LLM_BACKEND", "gemini") == "fake":
+            from fake_llm import FakeChatModel
+            llm = FakeChatModel(latency=float(os.getenv("FAKE_LLM_LATENCY", "0")))
+        if llm is None:
+            # Deferred: the Gemini client pulls in grpc and the google-genai SDK.
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            llm = ChatGoogleGenerativeAI(
+                model=_model,
+                temperature=0.5,
+                api_key=os.getenv("GEMINI_API_KEY"),
+                max_output_tokens=3000,
+                # Retries are handled by LLMRuntime so they share its backoff and concurrency cap.
+                max_retries=1,
+            )
+        self.llm = llm
+        self.runtime = get_llm_runtime()
+        self.cache = get_llm_cache()
+        self.cache_policy = cache_policy or os.getenv("LLM_CACHE_POLICY", "use")
+        if self.cache_policy not in self.CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy: {self.cache_policy}")
+
+    def with_cache_policy(self, cache_policy):
+        """Return a copy of this chain that uses a different cache policy (e.g. "refresh" on regenerate)."""
+        if cache_policy not in self.CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy: {cache_policy}")
+        chain = copy.copy(self)
+        chain.cache_policy = cache_policy
+        return chain
+
+    def _cache_key(self, prompt_text):
+        return response_key(
+            prompt_text,
+            getattr(self.llm, 'model', type(self.llm).__name__),
+            getattr(self.llm, 'temperature', None),
+            getattr(self.llm, 'max_output_tokens', None),
         )
 
+    def _cached(self, prompt_text):
+        """Return (key, cached message or None); key is None when the cache is not in play."""
+        if self.cache is None or self.cache_policy == "bypass":
+            return None, None
+        key = self._cache_key(prompt_text)
+        if self.cache_policy in ("use", "replay"):
+            content = self.cache.get(key)
+            tracing.record_cache("llm", content is not None)
+            if content is not None:
+                return key, AIMessage(content=content)
+        if self.cache_policy == "replay":
+            raise CacheMissError("No recorded response for this prompt.")
+        return key, None
+
+    def _store(self, key, prompt_text, res):
+        if key is not None and isinstance(res.content, str):
+            self.cache.put(key, getattr(self.llm, 'model', ''), prompt_text, res.content)
+
+    def _accept(self, key, prompt_text, res, fresh, parse):
+        """
+        Parse ``res`` and only then cache it. A response that fails to parse (raises or
+        returns None) is never stored, and a cached one that fails is evicted, so a
+        retry asks the model again instead of replaying the bad answer for the whole TTL.
+        """
+        try:
+            parsed = parse(res)
+        except Exception:
+            if key is not None and not fresh:
+                self.cache.delete(key)
+            raise
+        if parsed is None:
+            if key is not None and not fresh:
+                self.cache.delete(key)
+        elif fresh:
+            self._store(key, prompt_text, res)
+        return parsed
+
+    def _invoke(self, name, prompt, inputs, parse):
+        with tracing.span(f"llm.{name}") as span:
+            prompt_value = prompt.invoke(inputs)
+            prompt_text = prompt_value.to_string()
+            span.set(prompt_chars=len(prompt_text))
+            key, res = self._cached(prompt_text)
+            fresh = res is None
+            if fresh:
+                res = self.runtime.call(name, lambda: self.llm.invoke(prompt_value))
+                span.set(**_usage(res))
+            return self._accept(key, prompt_text, res, fresh, parse)
+
+    async def _ainvoke(self, name, prompt, inputs, parse):
+        with tracing.span(f"llm.{name}") as span:
+            prompt_value = prompt.invoke(inputs)
+            prompt_text = prompt_value.to_string()
+            span.set(prompt_chars=len(prompt_text))
+            key, res = self._cached(prompt_text)
+            fresh = res is None
+            if fresh:
+                res = await self.runtime.acall(name, lambda: self.llm.ainvoke(prompt_value))
+                span.set(**_usage(res))
+            return self._accept(key, prompt_text, res, fresh, parse)
+
     def extract_jobs(self, cleaned_text):
-        # Create embeddings of the cleaned text
-        model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-        text_embedding = model.encode(cleaned_text)
-        
-        # Split text into sections and find most relevant parts
-        sections = cleaned_text.split('\n\n')
-        section_embeddings = model.encode(sections)
-        
-        # Find most relevant sections for job information
-        similarities = torch.cosine_similarity(
-            torch.tensor(text_embedding).unsqueeze(0),
-            torch.tensor(section_embeddings),
-            dim=1
-        )
-        relevant_sections = [sections[i] for i in similarities.argsort(descending=True)[:3]]
-        
+        prompt, inputs = self._extract_jobs_prompt(cleaned_text)
+        return self._invoke("extract_jobs", prompt, inputs, self._parse_jobs)
+
+    async def aextract_jobs(self, cleaned_text):
+        # Section ranking is CPU-bound; keep it off the event loop.
+        prompt, inputs = await asyncio.to_thread(self._extract_jobs_prompt, cleaned_text)
+        return await self._ainvoke("extract_jobs", prompt, inputs, self._parse_jobs)
+
+    def _extract_jobs_prompt(self, cleaned_text):
+        # Small pages go in whole; larger ones as the overlapping windows closest to a job-posting query
+        with tracing.span("extract_jobs.rank_sections", text_chars=len(cleaned_text)):
+            relevant_sections = rank_sections(cleaned_text, get_embedding_service())
+
         prompt_extract = PromptTemplate.from_template(
             """
             ### RELEVANT SECTIONS FROM CAREERS PAGE:
@@ -62,9 +242,9 @@ class Chain:
             ### VALID JSON (NO PREAMBLE):
             """
         )
-        
-        chain_extract = prompt_extract | self.llm
-        res = chain_extract.invoke(input={"relevant_sections": "\n\n".join(relevant_sections)})
+        return prompt_extract, {"relevant_sections": "\n\n".join(relevant_sections)}
+
+    def _parse_jobs(self, res):
         try:
             json_parser = JsonOutputParser()
             res = json_parser.parse(res.content)
@@ -79,6 +259,14 @@ class Chain:
         Extracts job requirements, best resume evidence, strongest achievements,
         and identifies the best angle for personalization.
         """
+        prompt, inputs = self._analysis_prompt(job, resume_sections)
+        return self._invoke("analyze_fit", prompt, inputs, self._parse_analysis)
+
+    async def aanalyze_fit(self, job, resume_sections):
+        prompt, inputs = self._analysis_prompt(job, resume_sections)
+        return await self._ainvoke("analyze_fit", prompt, inputs, self._parse_analysis)
+
+    def _analysis_prompt(self, job, resume_sections):
         prompt_analysis = PromptTemplate.from_template(
             """
             ### JOB DESCRIPTION:
@@ -116,21 +304,21 @@ class Chain:
             """
         )
 
-        chain_analysis = prompt_analysis | self.llm
-        res = chain_analysis.invoke({
+        return prompt_analysis, {
             "role": job.get('role', 'Not specified'),
             "company": job.get('company_name', 'Not specified'),
             "skills": job.get('skills', 'Not specified'),
             "description": job.get('description', 'Not specified'),
             "resume_sections": resume_sections
-        })
+        }
 
+    def _parse_analysis(self, res):
         try:
             json_parser = JsonOutputParser()
             analysis = json_parser.parse(res.content)
             return analysis
         except OutputParserException as e:
-            st.error(f"Analysis parsing failed: {e}")
+            logger.error("Analysis parsing failed: %s", e)
             return None
 
     def generate_subject_line(self, analysis, job):
@@ -138,12 +326,25 @@ class Chain:
         STAGE 2A: Generate multiple subject line options and select the best.
         Subject lines are benefit-driven, specific, and create curiosity.
         """
-        if not analysis:
+        request = self._subject_prompt(analysis, job)
+        if request is None:
+            return self._fallback_subject(job)
+        return self._invoke("generate_subject_line", *request, lambda res: self._parse_subject(res, job))
+
+    async def agenerate_subject_line(self, analysis, job):
+        request = self._subject_prompt(analysis, job)
+        if request is None:
             return self._fallback_subject(job)
+        return await self._ainvoke("generate_subject_line", *request, lambda res: self._parse_subject(res, job))
+
+    def _subject_prompt(self, analysis, job):
+        """Return (prompt, inputs), or None when there is nothing to build a subject from."""
+        if not analysis:
+            return None
 
         subject_angles = analysis.get('subject_angles', [])
         if not subject_angles:
-            return self._fallback_subject(job)
+            return None
 
         prompt_subject = PromptTemplate.from_template(
             """
@@ -176,15 +377,15 @@ class Chain:
             """
         )
 
-        chain_subject = prompt_subject | self.llm
-        res = chain_subject.invoke({
+        return prompt_subject, {
             "role": job.get('role', 'Not specified'),
             "company": job.get('company_name', 'Not specified'),
             "top_req": analysis.get('top_job_requirements', [''])[0],
             "best_evidence": analysis.get('top_resume_evidence', [''])[0],
             "angles": '\n'.join(analysis.get('subject_angles', []))
-        })
+        }
 
+    def _parse_subject(self, res, job):
         subject = res.content.strip().strip('"\'')
         return subject if subject else self._fallback_subject(job)
 
@@ -198,6 +399,22 @@ class Chain:
         STAGE 2B: Generate email body with explicit persuasion structure.
         Uses analysis to drive evidence-backed, high-signal copy.
         """
+        try:
+            prompt, inputs = self._email_prompt(job, resume, word_limit, analysis)
+            return self._invoke("write_mail", prompt, inputs, lambda res: self.format_email(res.content))
+        except Exception as e:
+            logger.exception("Error generating email: %s", e)
+            return "An error occurred while generating the email. Please try again or consider writing the email manually."
+
+    async def awrite_mail(self, job, resume, word_limit, analysis=None):
+        try:
+            prompt, inputs = await asyncio.to_thread(self._email_prompt, job, resume, word_limit, analysis)
+            return await self._ainvoke("write_mail", prompt, inputs, lambda res: self.format_email(res.content))
+        except Exception as e:
+            logger.exception("Error generating email: %s", e)
+            return "An error occurred while generating the email. Please try again or consider writing the email manually."
+
+    def _email_prompt(self, job, resume, word_limit, analysis=None):
         job_requirements = f"{job.get('role', '')} {job.get('skills', '')} {job.get('description', '')}"
         relevant_resume_sections = resume.query_resume(job_requirements, n_results=5)
 
@@ -211,11 +428,7 @@ class Chain:
             )
             achievement_text = _escape_braces_for_prompt_template(raw_achievements)
 
-        greeting_name = self.extract_recipient_name(str(job))
-        if greeting_name:
-            greeting_opener = f"Hi {greeting_name.split()[0]},"
-        else:
-            greeting_opener = "Hi there,"
+        greeting_opener = self._greeting_opener(job)
 
         prompt_email = PromptTemplate.from_template(
             f"""
@@ -262,41 +475,239 @@ class Chain:
         """
         )
 
-        chain_email = prompt_email | self.llm
+        return prompt_email, {
+            "role": job.get('role', 'Position'),
+            "company": job.get('company_name', 'Company'),
+            "requirements": job.get('skills', 'Not specified'),
+            "strongest_overlap": strongest_overlap,
+            "relevant_sections": relevant_resume_sections,
+            "company_insight": analysis.get('company_insight', '') if analysis else '',
+            "greeting_opener": greeting_opener,
+        }
+
+    def _greeting_opener(self, job):
+        greeting_name = self.extract_recipient_name(str(job))
+        if greeting_name:
+            return f"Hi {greeting_name.split()[0]},"
+        return "Hi there,"
+
+    def generate_email(self, job, resume, word_limit, resume_sections=None, fused=None):
+        """
+        Produce analysis, subject and body for one job.
+
+        ``fused=True`` asks for all three in a single structured LLM call and falls
+        back to the three-stage path if the response does not validate; ``None``
+        uses the GENERATION_MODE env var. The returned ``mode`` records which path
+        produced the result so the two can be compared.
+        """
+        if resume_sections is None:
+            resume_sections = resume.get_all_sections_text()
+        if fused is None:
+            fused = os.getenv("GENERATION_MODE", "staged") == "fused"
+
+        if fused:
+            try:
+                prompt, inputs = self._fused_prompt(job, resume, word_limit, resume_sections)
+                result = self._invoke("generate_email_fused", prompt, inputs, lambda res: self._parse_fused(res, job))
+                if result is not None:
+                    return result
+            except OutputParserException:
+                pass
+
+        analysis = self.analyze_fit(job, resume_sections)
+        subject = self.generate_subject_line(analysis, job)
+        email_body = self.write_mail(job, resume, word_limit, analysis)
+        return {"analysis": analysis, "subject": subject, "email_body": email_body, "mode": "fused_fallback" if fused else "staged"}
+
+    async def agenerate_email(self, job, resume, word_limit, resume_sections=None, fused=None):
+        if resume_sections is None:
+            resume_sections = resume.get_all_sections_text()
+        if fused is None:
+            fused = os.getenv("GENERATION_MODE", "staged") == "fused"
+
+        if fused:
+            try:
+                prompt, inputs = await asyncio.to_thread(self._fused_prompt, job, resume, word_limit, resume_sections)
+                result = await self._ainvoke("generate_email_fused", prompt, inputs, lambda res: self._parse_fused(res, job))
+                if result is not None:
+                    return result
+            except OutputParserException:
+                pass
+
+        analysis = await self.aanalyze_fit(job, resume_sections)
+        subject = await self.agenerate_subject_line(analysis, job)
+        email_body = await self.awrite_mail(job, resume, word_limit, analysis)
+        return {"analysis": analysis, "subject": subject, "email_body": email_body, "mode": "fused_fallback" if fused else "staged"}
+
+    def _fused_prompt(self, job, resume, word_limit, resume_sections):
+        job_requirements = f"{job.get('role', '')} {job.get('skills', '')} {job.get('description', '')}"
+        relevant_resume_sections = resume.query_resume(job_requirements, n_results=5)
+
+        prompt_fused = PromptTemplate.from_template(
+            """
+            ### JOB DESCRIPTION:
+            Role: {role}
+            Company: {company}
+            Required Skills: {skills}
+            Description: {description}
+
+            ### CANDIDATE'S RESUME SECTIONS:
+            {resume_sections}
+
+            ### MOST RELEVANT RESUME ITEMS:
+            {relevant_sections}
+
+            ### INSTRUCTION:
+            Analyze the fit between the job and the resume, then write a subject line and a short job inquiry email from the candidate.
+            Return ONLY a valid JSON object with exactly these keys:
+
+            "analysis": object with
+              "top_job_requirements": 3-5 most critical job requirements (string array),
+              "top_resume_evidence": 3-4 strongest matching resume items (string array),
+              "skill_matches": object mapping job skills to resume skills,
+              "quantified_achievements": 1-3 achievements with metrics from the resume (string array),
+              "strongest_overlap": one plain-English sentence on the best fit, no buzzwords,
+              "company_insight": one specific reason this candidate should care about THIS company or role
+            "subject": ONE subject line, 4-12 words, sentence case, specific to the role; no buzzwords, clickbait, emoji, "Application for…" or "Re:…"
+            "email_body": the email text
+
+            Email rules:
+            - First line MUST be exactly: {greeting_opener}
+            - Then 1-2 short sentences on why you're reaching out, one paragraph tying 1-2 concrete outcomes (with numbers if available) to what they need, and one short, low-pressure closing line.
+            - Sign off with the candidate's first name from the resume header if obvious, otherwise "Best".
+            - Sound like a thoughtful human. Do not use: Revolutionizing, transformative, leverage, synergy, cutting-edge, game-changing, thrilled to, "I am confident my profile", "Please find my resume attached", "Dear Hiring Manager".
+            - Never apologize for missing company details.
+            - Max {word_limit} words. Paragraphs separated by blank lines (\\n\\n inside the JSON string). No bullet points. No subject line in the body.
+
+            ### VALID JSON (NO PREAMBLE):
+            """
+        )
+        return prompt_fused, {
+            "role": job.get('role', 'Not specified'),
+            "company": job.get('company_name', 'Not specified'),
+            "skills": job.get('skills', 'Not specified'),
+            "description": job.get('description', 'Not specified'),
+            "resume_sections": resume_sections,
+            "relevant_sections": relevant_resume_sections,
+            "greeting_opener": self._greeting_opener(job),
+            "word_limit": word_limit,
+        }
+
+    def _parse_fused(self, res, job):
+        """Validate the fused response; returns None when it does not match the expected schema."""
         try:
-            res = chain_email.invoke({
-                "role": job.get('role', 'Position'),
-                "company": job.get('company_name', 'Company'),
-                "requirements": job.get('skills', 'Not specified'),
-                "strongest_overlap": strongest_overlap,
-                "relevant_sections": relevant_resume_sections,
-                "company_insight": analysis.get('company_insight', '') if analysis else '',
-                "greeting_opener": greeting_opener,
-            })
-            formatted_email = self.format_email(res.content)
-            return formatted_email
-        except Exception as e:
-            st.error(f"Error generating email: {e}")
-            return "An error occurred while generating the email. Please try again or consider writing the email manually."
+            payload = JsonOutputParser().parse(res.content)
+        except OutputParserException:
+            return None
+        if not isinstance(payload, dict):
+            return None
+
+        analysis = payload.get('analysis')
+        subject = payload.get('subject')
+        email_body = payload.get('email_body')
+        if not isinstance(analysis, dict) or not isinstance(subject, str) or not isinstance(email_body, str):
+            return None
+        for key in ('top_job_requirements', 'top_resume_evidence', 'quantified_achievements'):
+            if not isinstance(analysis.get(key), list):
+                return None
+        for key in ('strongest_overlap', 'company_insight'):
+            if not isinstance(analysis.get(key), str):
+                return None
+
+        subject = subject.strip().strip('"\'')
+        if not subject or len(subject.split()) > 20 or not email_body.strip():
+            return None
+        return {
+            "analysis": analysis,
+            "subject": subject,
+            "email_body": self.format_email(email_body),
+            "mode": "fused",
+        }
 
     def format_email(self, email_content):
         """
         Clean and format email while preserving natural structure.
         Minimal intervention to maintain voice and readability.
         """
-        paragraphs = [p.strip() for p in email_content.split('\n\n') if p.strip()]
-
-        def clean_text(text):
-            return re.sub(r'\s+', ' ', text).strip()
+        formatter = EmailStreamFormatter()
+        return formatter.feed(email_content) + formatter.close()
 
-        formatted_paragraphs = []
-        for para in paragraphs:
-            para = clean_text(para)
-            if para and not re.search(r'[.!?]$', para):
-                para += '.'
-            formatted_paragraphs.append(para)
+    def stream_mail(self, job, resume, word_limit, analysis=None):
+        """
+        Streaming variant of ``write_mail``: yields formatted text as the model produces tokens.
 
-        return '\n\n'.join(formatted_paragraphs)
+        Joining everything yielded gives the same string ``write_mail`` returns.
+        """
+        formatter = EmailStreamFormatter()
+        started = False
+        # Not made current: the span stays open across yields to the caller.
+        span = tracing.start_span("llm.write_mail", streamed=True)
+        try:
+            prompt, inputs = self._email_prompt(job, resume, word_limit, analysis)
+            prompt_value = prompt.invoke(inputs)
+            prompt_text = prompt_value.to_string()
+            span.set(prompt_chars=len(prompt_text))
+            key, res = self._cached(prompt_text)
+            if res is not None:
+                span.end()
+                yield self.format_email(res.content)
+                return
+
+            raw = []
+            for chunk in self.runtime.stream("write_mail", lambda: self.llm.stream(prompt_value)):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                raw.append(text)
+                piece = formatter.feed(text)
+                if piece:
+                    started = True
+                    yield piece
+            yield formatter.close()
+            self._store(key, prompt_text, AIMessage(content="".join(raw)))
+            span.set(output_chars=sum(map(len, raw))).end()
+        except Exception as e:
+            span.end(e)
+            logger.exception("Error generating email: %s", e)
+            # LLMRuntime only retries before the first chunk; after that the body on screen is partial.
+            if started:
+                yield TRUNCATED_NOTICE
+            else:
+                yield "An error occurred while generating the email. Please try again or consider writing the email manually."
+
+    async def astream_mail(self, job, resume, word_limit, analysis=None):
+        formatter = EmailStreamFormatter()
+        started = False
+        # Not made current: the span stays open across yields to the caller.
+        span = tracing.start_span("llm.write_mail", streamed=True)
+        try:
+            prompt, inputs = await asyncio.to_thread(self._email_prompt, job, resume, word_limit, analysis)
+            prompt_value = prompt.invoke(inputs)
+            prompt_text = prompt_value.to_string()
+            span.set(prompt_chars=len(prompt_text))
+            key, res = self._cached(prompt_text)
+            if res is not None:
+                span.end()
+                yield self.format_email(res.content)
+                return
+
+            raw = []
+            async for chunk in self.runtime.astream("write_mail", lambda: self.llm.astream(prompt_value)):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                raw.append(text)
+                piece = formatter.feed(text)
+                if piece:
+                    started = True
+                    yield piece
+            yield formatter.close()
+            self._store(key, prompt_text, AIMessage(content="".join(raw)))
+            span.set(output_chars=sum(map(len, raw))).end()
+        except Exception as e:
+            span.end(e)
+            logger.exception("Error generating email: %s", e)
+            # LLMRuntime only retries before the first chunk; after that the body on screen is partial.
+            if started:
+                yield TRUNCATED_NOTICE
+            else:
+                yield "An error occurred while generating the email. Please try again or consider writing the email manually."
 
     def extract_recipient_name(self, job_description):
         if not isinstance(job_description, str):
@@ -3,50 +3,138 @@ from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 import os
 import base64
+import threading
+import weakref
+from urllib.parse import urljoin
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 from google.oauth2.credentials import Credentials
 
+# Gmail accepts up to 100 calls per batch but starts rate limiting well before that.
+BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+
 def generate_subject(job):
     """Generate a professional subject line based on the job description."""
     role = job.get('role', 'Job Position')
     company = job.get('company_name', 'Company')
     return f"Application for {role} at {company}"
 
-def send_email(credentials, sender_email, to, subject, body, attachment_path, attachment_name):
-    """Send an email with an attached resume using Gmail API."""
+def _attachment_bytes(attachment):
+    if hasattr(attachment, "getvalue"):
+        return attachment.getvalue()
+    if isinstance(attachment, memoryview):
+        return attachment.tobytes()
+    return attachment
+
+def build_message(sender_email, to, subject, body, attachment=None, attachment_name=None):
+    """Gmail API message resource for a plain-text email with an optional PDF attachment (bytes)."""
+    msg = MIMEMultipart()
+    msg['From'] = sender_email
+    msg['To'] = to
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    if attachment is not None:
+        resume_attachment = MIMEApplication(_attachment_bytes(attachment), _subtype="pdf")
+        resume_attachment.add_header('Content-Disposition', 'attachment', filename=attachment_name or "resume.pdf")
+        msg.attach(resume_attachment)
+    return {'raw': base64.urlsafe_b64encode(msg.as_bytes()).decode()}
+
+class GmailSender:
+    """
+    Sends mail for one Google account through a Gmail service built once.
+
+    The service uses the discovery document bundled with google-api-python-client,
+    so building it needs no network round trip. ``api_endpoint`` (or ``GMAIL_API_ENDPOINT``)
+    points it at another server, e.g. a local HTTP mock; ``http`` replaces the
+    authorized transport entirely (googleapiclient.http.HttpMock and friends).
+    """
+
+    def __init__(self, credentials=None, sender_email=None, api_endpoint=None, http=None):
+        api_endpoint = api_endpoint or os.getenv("GMAIL_API_ENDPOINT")
+        options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        auth = {"http": http} if http is not None else {"credentials": credentials}
+        self.service = build('gmail', 'v1', cache_discovery=False, static_discovery=True,
+                             client_options=options, **auth)
+        # new_batch_http_request() always targets the discovery rootUrl and ignores api_endpoint.
+        self._batch_uri = urljoin(api_endpoint, "batch") if api_endpoint else None
+        self.sender_email = sender_email
+        # httplib2 connections are not thread-safe; one request at a time per account.
+        self._lock = threading.Lock()
+
+    def send(self, to, subject, body, attachment=None, attachment_name=None, sender_email=None):
+        """Send one email and return the Gmail message id. Raises HttpError on failure."""
+        message = build_message(sender_email or self.sender_email, to, subject, body, attachment, attachment_name)
+        with self._lock:
+            sent = self.service.users().messages().send(userId="me", body=message).execute()
+        return sent['id']
+
+    def send_batch(self, emails, batch_size=None):
+        """
+        Send several emails with Gmail batch HTTP requests (``batch_size`` per round trip).
+
+        ``emails`` holds dicts with the keyword arguments of ``send``. Returns one
+        ``(message_id, error)`` pair per email, in order; exactly one of them is None.
+        """
+        emails = list(emails)
+        results = [None] * len(emails)
+        batch_size = batch_size or BATCH_SIZE
+
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            results[index] = (None, exception) if exception is not None else (response['id'], None)
+
+        with self._lock:
+            for start in range(0, len(emails), batch_size):
+                if self._batch_uri:
+                    batch = BatchHttpRequest(callback=on_response, batch_uri=self._batch_uri)
+                else:
+                    batch = self.service.new_batch_http_request(callback=on_response)
+                for index in range(start, min(start + batch_size, len(emails))):
+                    email = dict(emails[index])
+                    sender_email = email.pop('sender_email', None) or self.sender_email
+                    message = build_message(sender_email, **email)
+                    batch.add(self.service.users().messages().send(userId="me", body=message),
+                              request_id=str(index))
+                batch.execute()
+        return results
+
+_senders = weakref.WeakKeyDictionary()
+_senders_lock = threading.Lock()
+
+def get_gmail_sender(credentials):
+    """GmailSender for ``credentials``, reused for as long as that credentials object lives."""
+    with _senders_lock:
+        sender = _senders.get(credentials)
+        if sender is None:
+            sender = _senders[credentials] = GmailSender(credentials)
+        return sender
+
+def send_email(credentials, sender_email, to, subject, body, attachment=None, attachment_name=None):
+    """
+    Send an email with an attached resume using Gmail API.
+
+    ``attachment`` is the file's bytes (or an upload exposing ``getvalue``); a path
+    to a file on disk is still accepted.
+    """
     try:
-        service = build('gmail', 'v1', credentials=credentials)
-        if not service:
-            raise ValueError("Failed to authenticate with Gmail API.")
-
-        # Create a multipart email
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to
-        msg['Subject'] = subject
-
-        # Attach the plain text version of the email
-        msg.attach(MIMEText(body, 'plain'))  # Plain text version
-
-        # Attach the resume file
-        if attachment_path and os.path.exists(attachment_path):
-            try:
-                with open(attachment_path, 'rb') as f:
-                    resume_attachment = MIMEApplication(f.read(), _subtype="pdf")
-                    filename = attachment_name if attachment_name else os.path.basename(attachment_path)
-                    resume_attachment.add_header('Content-Disposition', 'attachment', filename=filename)
-                    msg.attach(resume_attachment)
-            except Exception as e:
-                raise ValueError(f"Failed to attach resume: {e}")
-
-        # Send the email using Gmail API
+        if isinstance(attachment, str):
+            if not os.path.exists(attachment):
+                attachment = None
+            else:
+                try:
+                    attachment_name = attachment_name or os.path.basename(attachment)
+                    with open(attachment, 'rb') as f:
+                        attachment = f.read()
+                except Exception as e:
+                    raise ValueError(f"Failed to attach resume: {e}")
+
         try:
-            raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-            message = {'raw': raw}
-            sent_message = service.users().messages().send(userId="me", body=message).execute()
-            return f"Email sent successfully! Message ID: {sent_message['id']}"
+            message_id = get_gmail_sender(credentials).send(
+                to, subject, body, attachment, attachment_name, sender_email=sender_email
+            )
+            return f"Email sent successfully! Message ID: {message_id}"
         except HttpError as error:
             raise ValueError(f"An error occurred: {error}")
     except Exception as e:
-        return f"An error occurred: {e}"
\ No newline at end of file
+        return f"An error occurred: {e}"
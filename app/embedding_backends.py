@@ -0,0 +1,138 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from utils import data_path
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class TorchBackend:
+    """sentence-transformers on PyTorch; the reference implementation."""
+
+    name = "torch"
+
+    def __init__(self, model_name, device="cpu", num_threads=0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model.eval()
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        import torch
+
+        with torch.no_grad():
+            return self.model.encode(texts, batch_size=batch_size, show_progress_bar=False, **kwargs)
+
+
+class OnnxBackend:
+    """
+    The same MiniLM run through ONNX Runtime on CPU, without torch at inference time.
+
+    Uses the model repository's ``onnx/model.onnx`` export (or ``EMBEDDING_ONNX_PATH``)
+    and, when ``quantize`` is set, an int8 dynamically quantized copy of it that is
+    written next to the original on first use. Tokenization and mean pooling match
+    sentence-transformers for the paraphrase-MiniLM family.
+    """
+
+    def __init__(self, model_name, num_threads=0, quantize=False, onnx_path=None, max_length=None):
+        import onnxruntime as ort
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        onnx_path = onnx_path or os.getenv("EMBEDDING_ONNX_PATH") or _download(repo_id, "onnx/model.onnx")
+        if quantize:
+            onnx_path = _quantized(onnx_path)
+
+        self.tokenizer = _load_tokenizer(repo_id, max_length or int(os.getenv("EMBEDDING_MAX_LENGTH", "128")))
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = []
+        for start in range(0, len(texts), batch_size):
+            out.append(self._encode_batch(texts[start:start + batch_size]))
+        vectors = np.concatenate(out) if out else np.empty((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(vectors):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        # Mean pooling over real (unpadded) tokens, as in the model's sentence-transformers config.
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return (summed / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+
+def _download(repo_id, filename):
+    from huggingface_hub import hf_hub_download
+
+    return hf_hub_download(repo_id, filename)
+
+
+def _load_tokenizer(repo_id, max_length):
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(_download(repo_id, "tokenizer.json"))
+    tokenizer.enable_truncation(max_length=max_length)
+    tokenizer.enable_padding()
+    return tokenizer
+
+
+def _quantized(onnx_path):
+    """
+    Path of an int8 dynamically quantized copy of ``onnx_path``, creating it if needed.
+
+    The copy lives in the app's data directory rather than the Hugging Face cache, named
+    after the source file (Hub snapshots link to content-addressed blobs), and is written
+    to a unique temporary file first, so API workers quantizing at the same time never
+    read or clobber each other's half-written output.
+    """
+    target = os.getenv("EMBEDDING_ONNX_INT8_PATH")
+    if not target:
+        digest = hashlib.sha256(os.path.realpath(onnx_path).encode("utf-8")).hexdigest()[:16]
+        target = data_path(f"{os.path.basename(onnx_path)[:-len('.onnx')]}-{digest}.int8.onnx")
+    if not os.path.exists(target):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        directory = os.path.dirname(os.path.abspath(target))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, prefix=".quantize-", suffix=".onnx", delete=False) as tmp:
+            pass
+        try:
+            quantize_dynamic(onnx_path, tmp.name, weight_type=QuantType.QInt8)
+            os.replace(tmp.name, target)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    return target
+
+
+def load_backend(name, model_name, device="cpu", num_threads=0):
+    """Instantiate the embedding backend called ``name`` (one of BACKENDS)."""
+    if name == "torch":
+        return TorchBackend(model_name, device=device, num_threads=num_threads)
+    if name in ("onnx", "onnx-int8"):
+        if device != "cpu":
+            raise ValueError(f"The {name} embedding backend only runs on CPU, not {device!r}.")
+        return OnnxBackend(model_name, num_threads=num_threads, quantize=name == "onnx-int8")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}.")
@@ -0,0 +1,212 @@
+import contextlib
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of the same text share a cache entry."""
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def text_key(model_name, text):
+    digest = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only on-disk tier for one model, safe to share between processes.
+
+    Vectors live in a raw float32 file that is read through ``np.memmap``; a
+    sidecar file starts with the vector dimension and then has one "row key"
+    line per vector. Appends hold an exclusive ``flock`` and take the row
+    number from the vector file's size, so processes sharing the directory
+    (e.g. the API workers) never hand out the same row twice.
+    """
+
+    def __init__(self, directory, model_name):
+        slug = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, f"{slug}.f32")
+        self.keys_path = os.path.join(directory, f"{slug}.keys")
+        self.lock_path = os.path.join(directory, f"{slug}.lock")
+        self.dim = None
+        self._rows = {}
+        self._keys_offset = 0
+        self._mmap = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            # No flock (Windows): a single process owns the directory.
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Pick up key lines appended since the last read, by this or another process."""
+        if not os.path.exists(self.keys_path) or os.path.getsize(self.keys_path) <= self._keys_offset:
+            return
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        # A trailing line without its newline is still being written (or was cut off by a crash).
+        complete = data[:data.rfind(b'\n') + 1]
+        self._keys_offset += len(complete)
+        for line in complete.decode('utf-8', errors='replace').splitlines():
+            if self.dim is None:
+                self.dim = int(line)
+                continue
+            row, _, key = line.partition(' ')
+            if key and row.isdigit():
+                self._rows.setdefault(key, int(row))
+
+    def _n_rows(self):
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _mapped(self, row):
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self._n_rows(), self.dim))
+        return self._mmap
+
+    def get(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                self._refresh()
+                row = self._rows.get(key)
+            # Ignore rows whose vector is not (fully) on disk.
+            if row is None or row >= self._n_rows():
+                return None
+            return np.array(self._mapped(row)[row])
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock, self._file_lock():
+            self._refresh()
+            if key in self._rows:
+                return
+            if self.dim is None:
+                self.dim = vector.shape[0]
+                with open(self.keys_path, 'w', encoding='utf-8') as f:
+                    f.write(f"{self.dim}\n")
+                self._keys_offset = os.path.getsize(self.keys_path)
+            elif vector.shape[0] != self.dim:
+                return
+            row_bytes = 4 * self.dim
+            size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+            with open(self.vectors_path, 'ab') as f:
+                if size % row_bytes:
+                    # Drop a partial row left by a crash so the new vector starts on a row boundary.
+                    f.truncate(size - size % row_bytes)
+                row = size // row_bytes
+                f.write(vector.tobytes())
+            with open(self.keys_path, 'a', encoding='utf-8') as f:
+                # Under the lock nobody else is writing, so bytes past the last newline are a
+                # torn line from a crash; cut them off so the new line starts cleanly.
+                if os.path.getsize(self.keys_path) > self._keys_offset:
+                    f.truncate(self._keys_offset)
+                f.write(f"{row} {key}\n")
+            self._rows[key] = row
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model name, normalized text hash).
+
+    A bounded in-memory LRU sits in front of an optional memory-mapped disk tier.
+    """
+
+    def __init__(self, max_entries=10000, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._disk = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def _disk_store(self, model_name):
+        if not self.directory:
+            return None
+        store = self._disk.get(model_name)
+        if store is None:
+            store = self._disk[model_name] = DiskEmbeddingStore(self.directory, model_name)
+        return store
+
+    def get(self, model_name, text):
+        key = text_key(model_name, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            store = self._disk_store(model_name)
+        vector = store.get(key) if store is not None else None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, vector)
+        return vector
+
+    def put(self, model_name, text, vector):
+        key = text_key(model_name, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector)
+            store = self._disk_store(model_name)
+        if store is not None:
+            store.put(key, vector)
+
+    def _remember(self, key, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = 0
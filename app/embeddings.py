@@ -0,0 +1,121 @@
+import os
+import threading
+import warnings
+
+import numpy as np
+
+from embedding_backends import load_backend
+from embedding_cache import EmbeddingCache, normalize_text
+import tracing
+
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+DEFAULT_EMBEDDING_MODEL = 'paraphrase-MiniLM-L6-v2'
+
+
+class EmbeddingService:
+    """
+    Process-wide sentence embedding engine shared by Chain and Resume.
+
+    The underlying model is loaded lazily on first use and reused by every
+    request afterwards, so only the first caller pays the load cost.
+    """
+
+    def __init__(self, model_name=None, device=None, num_threads=None, batch_size=None, cache=None, backend=None):
+        self.model_name = model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        self.backend = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+        # Backends differ slightly numerically, so cached vectors are kept apart per backend.
+        self.cache_name = self.model_name if self.backend == "torch" else f"{self.model_name}@{self.backend}"
+        self.device = device or os.getenv("EMBEDDING_DEVICE", "cpu")
+        self.num_threads = num_threads or int(os.getenv("EMBEDDING_THREADS", "0"))
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+        if cache is None:
+            cache = EmbeddingCache(
+                max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+                directory=os.getenv("EMBEDDING_CACHE_DIR") or None,
+            )
+        self.cache = cache
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        return load_backend(self.backend, self.model_name, device=self.device, num_threads=self.num_threads)
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        """
+        Encode a string or a list of strings.
+
+        Returns a single vector for a string and a 2-D array for a list,
+        mirroring ``SentenceTransformer.encode``. Texts already in the
+        embedding cache are not sent through the model again.
+        """
+        kwargs.pop("show_progress_bar", None)
+        if kwargs:
+            # Options such as normalize_embeddings change the output, so they bypass the cache.
+            return self._encode(texts, batch_size, **kwargs)
+
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        vectors = [self.cache.get(self.cache_name, text) for text in texts]
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(normalize_text(texts[i]), []).append(i)
+        n_missing = sum(map(len, missing.values()))
+        tracing.record_cache("embeddings", True, len(texts) - n_missing)
+        tracing.record_cache("embeddings", False, n_missing)
+        if missing:
+            encoded = self._encode([texts[rows[0]] for rows in missing.values()], batch_size)
+            for rows, vector in zip(missing.values(), encoded):
+                self.cache.put(self.cache_name, texts[rows[0]], vector)
+                for i in rows:
+                    vectors[i] = vector
+
+        if single:
+            return np.array(vectors[0], dtype=np.float32)
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors).astype(np.float32, copy=False)
+
+    def _encode(self, texts, batch_size=None, **kwargs):
+        with tracing.span("embeddings.encode", backend=self.backend,
+                          texts=1 if isinstance(texts, str) else len(texts)):
+            return self.model.encode(texts, batch_size=batch_size or self.batch_size, **kwargs)
+
+    def warm_up(self):
+        """Load the model and run one tiny batch so the first real request is not slowed down."""
+        self._encode(["warm up"])
+        return self
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """Return the process-wide EmbeddingService, creating it on first call."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
+
+
+def warm_up_in_background():
+    """Start loading the embedding model on a daemon thread and return the thread."""
+    thread = threading.Thread(target=lambda: get_embedding_service().warm_up(), name="embedding-warm-up", daemon=True)
+    thread.start()
+    return thread
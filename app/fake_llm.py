@@ -0,0 +1,142 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeRateLimitError(Exception):
+    """Stands in for a Gemini 429 so retry/backoff can be exercised offline."""
+
+    status_code = 429
+
+
+FAKE_JOBS = [
+    {
+        "company_name": "Acme Robotics",
+        "role": "Backend Engineer",
+        "experience": "3+ years",
+        "skills": ["Python", "PostgreSQL", "AWS"],
+        "description": "Build and scale the APIs behind our fleet management platform.",
+    }
+]
+
+FAKE_ANALYSIS = {
+    "top_job_requirements": ["3+ years Python", "PostgreSQL", "AWS"],
+    "top_resume_evidence": ["Built REST APIs in Django", "Ran Postgres in production", "Deployed on AWS ECS"],
+    "skill_matches": {"Python": "Python, Django", "AWS": "ECS, RDS"},
+    "quantified_achievements": ["Cut API p95 latency by 40%"],
+    "strongest_overlap": "Several years of Python API work on AWS, close to what the role describes.",
+    "company_insight": "The fleet platform is scaling, which is the kind of backend work I've done.",
+    "subject_angles": ["Your backend engineer opening", "Python + AWS background for the backend role"],
+}
+
+FAKE_SUBJECT = "Quick note on the backend engineer opening"
+
+FAKE_EMAIL = (
+    "Hi there,\n\n"
+    "I saw the backend engineer opening and it lines up closely with the API work I've been doing.\n\n"
+    "Over the last few years I've built and run Python services on AWS, and cut p95 latency by 40% on "
+    "our busiest endpoint by reworking the query layer.\n\n"
+    "Happy to share more or chat for 15 minutes if useful.\n\n"
+    "Best"
+)
+
+
+def default_responder(prompt):
+    """Pick a canned response that parses the way Chain expects for the given prompt."""
+    if "Extract job postings" in prompt:
+        return json.dumps(FAKE_JOBS)
+    if '"email_body"' in prompt:
+        return json.dumps({"analysis": FAKE_ANALYSIS, "subject": FAKE_SUBJECT, "email_body": FAKE_EMAIL})
+    if "Perform a structured analysis" in prompt:
+        return json.dumps(FAKE_ANALYSIS)
+    if "email subject line" in prompt:
+        return FAKE_SUBJECT
+    return FAKE_EMAIL
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for ChatGoogleGenerativeAI.
+
+    Responses come from ``responder(prompt_text)``; ``latency`` (seconds, plus
+    optional ``jitter``) is slept per call, and ``error_rate`` injects 429s.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+    responder: Any = default_responder
+    model: str = "fake-gemini"
+
+    _rng: Any = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def _prompt_text(self, messages):
+        return "\n".join(str(m.content) for m in messages)
+
+    def _delay(self):
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        rng = self._rng
+        if self.error_rate and rng.random() < self.error_rate:
+            raise FakeRateLimitError("429 RESOURCE_EXHAUSTED (fake)")
+        return self.latency + (rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _message(self, prompt, content):
+        input_tokens = len(prompt.split())
+        output_tokens = len(content.split())
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        time.sleep(self._delay())
+        message = self._message(prompt, self.responder(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        await asyncio.sleep(self._delay())
+        message = self._message(prompt, self.responder(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self, content):
+        # Word-sized chunks, keeping the whitespace so the stream reassembles exactly.
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        delay = self._delay()
+        content = self.responder(prompt)
+        pieces = list(self._chunks(content))
+        for piece in pieces:
+            time.sleep(delay / max(len(pieces), 1))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        delay = self._delay()
+        content = self.responder(prompt)
+        pieces = list(self._chunks(content))
+        for piece in pieces:
+            await asyncio.sleep(delay / max(len(pieces), 1))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
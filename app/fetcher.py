@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+import tracing
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "mc_cid", "mc_eid")
+
+
+class PageTooLargeError(ValueError):
+    """The response body exceeded the fetcher's size limit."""
+
+
+def normalize_url(url):
+    """
+    Canonical form used as the page cache key: lower-case scheme and host, no
+    default port, no fragment, tracking parameters dropped and the rest sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+@dataclass
+class CachedPage:
+    url: str
+    html: str
+    etag: str = None
+    last_modified: str = None
+    fetched_at: float = 0.0
+
+
+class PageFetcher:
+    """
+    Shared job-page fetcher: one pooled HTTP session, a TTL page cache keyed by
+    normalized URL, ETag / Last-Modified revalidation, timeouts and a size cap.
+    """
+
+    def __init__(self, ttl_seconds=300, max_entries=256, max_bytes=5 * 1024 * 1024,
+                 connect_timeout=5.0, read_timeout=15.0, pool_size=16, session=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = session or self._build_session(pool_size)
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def _build_session(pool_size):
+        session = requests.Session()
+        retry = Retry(total=2, connect=2, read=1, backoff_factor=0.3,
+                      status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = os.getenv("USER_AGENT", "ColdEmailGenerator/1.0")
+        return session
+
+    def fetch(self, url):
+        """Return the raw HTML of ``url``, from cache when it is fresh or unchanged."""
+        with tracing.span("fetch.page") as span:
+            html, result = self._fetch(url)
+            tracing.record_cache("page", result != "miss")
+            span.set(result=result, chars=len(html))
+            return html
+
+    def _fetch(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+        now = time.time()
+        if cached is not None and now - cached.fetched_at < self.ttl_seconds:
+            with self._lock:
+                self.hits += 1
+            return cached.html, "hit"
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cached is not None:
+                cached.fetched_at = now
+                with self._lock:
+                    self.revalidated += 1
+                return cached.html, "revalidated"
+            response.raise_for_status()
+            html = self._read_body(response)
+            page = CachedPage(
+                url=key,
+                html=html,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                fetched_at=now,
+            )
+
+        with self._lock:
+            self.misses += 1
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return html, "miss"
+
+    def _read_body(self, response):
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise PageTooLargeError(f"Page is {int(length)} bytes; limit is {self.max_bytes}.")
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise PageTooLargeError(f"Page exceeds the {self.max_bytes} byte limit.")
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        if "charset" in response.headers.get("Content-Type", "").lower() and response.encoding:
+            return body.decode(response.encoding, errors="replace")
+        # requests assumes ISO-8859-1 when no charset is given, which is wrong for most pages.
+        try:
+            return body.decode("utf-8")
+        except UnicodeDecodeError:
+            return body.decode("cp1252", errors="replace")
+
+    def fetch_text(self, url):
+        """Visible page text, extracted the same way WebBaseLoader does."""
+        return html_to_text(self.fetch(url))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._pages),
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+            }
+
+
+def html_to_text(html):
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_page_fetcher():
+    """Return the process-wide PageFetcher."""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = PageFetcher(
+                    ttl_seconds=float(os.getenv("PAGE_CACHE_TTL", "300")),
+                    max_entries=int(os.getenv("PAGE_CACHE_SIZE", "256")),
+                    max_bytes=int(os.getenv("PAGE_MAX_BYTES", str(5 * 1024 * 1024))),
+                )
+    return _fetcher
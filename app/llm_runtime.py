@@ -0,0 +1,214 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = ("RateLimit", "ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded")
+_RETRYABLE_MESSAGE_RE = re.compile(r'\b(429|500|502|503|504)\b|RESOURCE_EXHAUSTED|UNAVAILABLE|rate limit', re.IGNORECASE)
+
+
+def is_retryable(error):
+    """True for rate-limit (429) and server-side (5xx) failures from the Gemini API."""
+    for attr in ("status_code", "code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status in _RETRYABLE_STATUS
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status in _RETRYABLE_STATUS
+    if any(name in type(error).__name__ for name in _RETRYABLE_NAMES):
+        return True
+    return bool(_RETRYABLE_MESSAGE_RE.search(str(error)))
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight LLM requests across threads and event loops.
+
+    Streamlit runs each script in its own thread and ``asyncio.run`` creates a new
+    loop per call, so a plain ``asyncio.Semaphore`` would only limit one loop.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def _try_acquire(self):
+        with self._cond:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self):
+        delay = 0.005
+        while not self._try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+
+class LatencyMetrics:
+    """Per-call-name latency samples (bounded) with simple percentile summaries."""
+
+    def __init__(self, max_samples=1000):
+        self._samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self._counts = defaultdict(lambda: {"calls": 0, "errors": 0, "retries": 0})
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, error=False, retries=0):
+        with self._lock:
+            self._samples[name].append(seconds)
+            counts = self._counts[name]
+            counts["calls"] += 1
+            counts["errors"] += int(error)
+            counts["retries"] += retries
+
+    def summary(self):
+        with self._lock:
+            out = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                out[name] = dict(
+                    self._counts[name],
+                    p50=_percentile(ordered, 50),
+                    p95=_percentile(ordered, 95),
+                    max=ordered[-1] if ordered else 0.0,
+                )
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LLMRuntime:
+    """Shared concurrency cap, jittered exponential backoff and latency metrics for LLM calls."""
+
+    def __init__(self, max_concurrency=None, max_attempts=None, base_delay=None, max_delay=None):
+        self.limiter = ConcurrencyLimiter(max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+        self.max_attempts = max_attempts or int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+        self.metrics = LatencyMetrics()
+
+    def backoff(self, attempt):
+        # "Full jitter": uniform in [0, base * 2^attempt], capped.
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, name, fn):
+        start = time.perf_counter()
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts or not is_retryable(e):
+                    self.metrics.record(name, time.perf_counter() - start, error=True, retries=attempt)
+                    raise
+            else:
+                self.metrics.record(name, time.perf_counter() - start, retries=attempt)
+                return result
+            finally:
+                self.limiter.release()
+            time.sleep(self.backoff(attempt))
+
+    async def acall(self, name, coro_fn):
+        start = time.perf_counter()
+        for attempt in range(self.max_attempts):
+            await self.limiter.aacquire()
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts or not is_retryable(e):
+                    self.metrics.record(name, time.perf_counter() - start, error=True, retries=attempt)
+                    raise
+            else:
+                self.metrics.record(name, time.perf_counter() - start, retries=attempt)
+                return result
+            finally:
+                self.limiter.release()
+            await asyncio.sleep(self.backoff(attempt))
+
+    def stream(self, name, fn):
+        """Iterate a streaming call; retries only happen before the first chunk arrives."""
+        start = time.perf_counter()
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire()
+            started = False
+            try:
+                for chunk in fn():
+                    if not started:
+                        started = True
+                        self.metrics.record(f"{name}:first_token", time.perf_counter() - start)
+                    yield chunk
+            except Exception as e:
+                if started or attempt + 1 >= self.max_attempts or not is_retryable(e):
+                    self.metrics.record(name, time.perf_counter() - start, error=True, retries=attempt)
+                    raise
+            else:
+                self.metrics.record(name, time.perf_counter() - start, retries=attempt)
+                return
+            finally:
+                self.limiter.release()
+            time.sleep(self.backoff(attempt))
+
+    async def astream(self, name, fn):
+        start = time.perf_counter()
+        for attempt in range(self.max_attempts):
+            await self.limiter.aacquire()
+            started = False
+            try:
+                async for chunk in fn():
+                    if not started:
+                        started = True
+                        self.metrics.record(f"{name}:first_token", time.perf_counter() - start)
+                    yield chunk
+            except Exception as e:
+                if started or attempt + 1 >= self.max_attempts or not is_retryable(e):
+                    self.metrics.record(name, time.perf_counter() - start, error=True, retries=attempt)
+                    raise
+            else:
+                self.metrics.record(name, time.perf_counter() - start, retries=attempt)
+                return
+            finally:
+                self.limiter.release()
+            await asyncio.sleep(self.backoff(attempt))
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_llm_runtime():
+    """Return the process-wide LLMRuntime shared by every Chain."""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = LLMRuntime()
+    return _runtime
@@ -1,20 +1,19 @@
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
-from chains import Chain
-from resume import Resume
 from utils import clean_text
 from sidebar import *
-from email_services import send_email
-import tempfile
+from service import GenerationError, GenerationService, get_generation_service
+from rate_limit import get_rate_limiter
+from outbox import get_outbox
+import tracing
 import os
+import threading
 import time
-from authlib.integrations.requests_client import OAuth2Session
 import requests
-from oauth import get_flow, authenticate_user, get_credentials, SCOPES, get_user_info
-from dotenv import load_dotenv
-from google.auth.transport.requests import Request
-import pickle
-from oauth import Flow, SCOPES
+from oauth import authenticate_user, get_credentials, get_user_info, Flow
+
+# chains, resume and email_services pull in langchain, torch / onnxruntime, PyPDF2 and the
+# Google API client. They are imported on first use (or by the warm-up thread) so the
+# login page does not wait for them.
 
 # Try to load .env file for local development
 try:
@@ -57,19 +56,45 @@ redirect_uri = client_secrets["web"]["redirect_uris"][0]
 
 SCOPES = ['https://www.googleapis.com/auth/userinfo.email', 'openid']
 OPTIONAL_SCOPES = ['https://www.googleapis.com/auth/gmail.send']
-if 'last_email_generation' not in st.session_state:
-    st.session_state.last_email_generation = 0
-if 'email_generation_count' not in st.session_state:
-    st.session_state.email_generation_count = 0
 
-EMAIL_GENERATION_COOLDOWN = 60  # 60 seconds cooldown
-MAX_GENERATIONS_PER_DAY = 5  # Maximum number of generations per day
+def rate_limit_user():
+    # Limits follow the Google account. Without an email they follow the client address, which,
+    # unlike the session, survives a page refresh; if that is unknown all such users share one bucket.
+    if st.session_state.get('user_email'):
+        return st.session_state.user_email.lower()
+    context = getattr(st, "context", None)
+    forwarded = context.headers.get("X-Forwarded-For", "") if context is not None else ""
+    # The last hop was appended by our own proxy; earlier ones are whatever the client sent.
+    address = forwarded.split(",")[-1].strip() or getattr(context, "ip_address", None)
+    return f"anonymous:{address}" if address else "anonymous"
+
+def _warm_up():
+    import email_services  # noqa: F401
+
+    service = get_generation_service()
+    # With GENERATION_API_URL set the model lives behind the API, so there is nothing to load here.
+    if isinstance(service, GenerationService):
+        import chains, resume  # noqa: F401
+        service.warm_up()
+
+@st.cache_resource
+def start_warm_up():
+    # Runs once per process, after the first page has rendered: import the heavy modules
+    # and load the shared embedding model before the first generation needs them.
+    thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def start_metrics_server():
+    # Serves /metrics on METRICS_PORT when it is set; once per process.
+    return tracing.start_metrics_server()
 
 def get_flow(client_secrets, redirect_uri, include_optional=True):
     scopes = SCOPES + (OPTIONAL_SCOPES if include_optional else [])
     return Flow.from_client_config(client_secrets, scopes=scopes, redirect_uri=redirect_uri)
 
-def create_streamlit_app(llm, clean_text):
+def create_streamlit_app(clean_text):
     add_sidebar()
     # Initialize session state variables
     if 'is_authenticated' not in st.session_state:
@@ -83,7 +108,8 @@ def create_streamlit_app(llm, clean_text):
     if not st.session_state.is_authenticated:
         handle_authentication()
     else:
-        main_app_logic(llm, clean_text)
+        main_app_logic(get_generation_service(), clean_text)
+    start_warm_up()
 
 def handle_authentication():
     if 'code' in st.query_params:
@@ -137,7 +163,17 @@ def display_auth_link():
         
 
 
-def main_app_logic(llm, clean_text):
+def stream_single_job(llm, job, resume, word_limit):
+    analysis = llm.analyze_fit(job, resume.get_all_sections_text())
+    subject = llm.generate_subject_line(analysis, job)
+    preview = st.empty()
+    with preview.container():
+        st.markdown(f"**Subject:** {subject}")
+        email_body = st.write_stream(llm.stream_mail(job, resume, word_limit, analysis))
+    preview.empty()
+    return {"job": job, "analysis": analysis, "subject": subject, "email_body": email_body, "mode": "staged", "error": None}
+
+def main_app_logic(service, clean_text):
     st.title("📧 Cold Mail Generator")
 
     # Logout button
@@ -170,6 +206,12 @@ def main_app_logic(llm, clean_text):
     resume_file = st.file_uploader("Upload your Resume:", type=["pdf"])
     
     word_limit = st.slider("Select the number of words for the email response:", min_value=50, max_value=200, value=100, step=50)
+    fused_mode = st.toggle(
+        "Fast mode (single AI call)",
+        value=os.getenv("GENERATION_MODE", "staged") == "fused",
+        help="Analyze, write the subject and write the body in one request instead of three.",
+    )
+    regenerate = st.checkbox("Regenerate from scratch (ignore cached results)", value=False)
 
     submit_button = st.button("Generate Email")
 
@@ -179,52 +221,58 @@ def main_app_logic(llm, clean_text):
         st.session_state.email_body = ""
     if 'analysis' not in st.session_state:
         st.session_state.analysis = None
+    if 'results' not in st.session_state:
+        st.session_state.results = []
 
+    limiter = get_rate_limiter()
     if submit_button:
-        current_time = time.time()
-        time_since_last_generation = current_time - st.session_state.last_email_generation
-        
-        if time_since_last_generation < EMAIL_GENERATION_COOLDOWN:
-            remaining_time = int(EMAIL_GENERATION_COOLDOWN - time_since_last_generation)
-            st.warning(f"Please wait {remaining_time} seconds before generating another email.")
-        elif st.session_state.email_generation_count >= MAX_GENERATIONS_PER_DAY:
-            st.warning(f"You've reached the maximum number of email generations ({MAX_GENERATIONS_PER_DAY}) for today.")
+        user = rate_limit_user()
+        decision = limiter.acquire(user)
+
+        if decision.reason == "cooldown":
+            st.warning(f"Please wait {int(decision.retry_after) + 1} seconds before generating another email.")
+        elif decision.reason == "quota":
+            st.warning(f"You've reached the maximum number of email generations ({limiter.daily_limit}) for today.")
         else:
-            try:
-                if resume_file:
-                    resume = Resume()
-                    loaded = resume.load_resume(resume_file)
-                    if loaded is not None:
+            generated = False
+            with tracing.span("generate", fused=fused_mode, regenerate=regenerate) as generation_span:
+                try:
+                    if resume_file:
                         with st.spinner("Analyzing job posting and resume..."):
-                            loader = WebBaseLoader([url_input])
-                            page_content = loader.load().pop().page_content
-                            data = clean_text(str(page_content))
-
-                            jobs = llm.extract_jobs(data)
-                            if not isinstance(jobs, list):
-                                jobs = [jobs]
-
                             st.session_state.subject = ""
                             st.session_state.email_body = ""
                             st.session_state.analysis = None
-
-                            for job in jobs:
-                                resume_sections = resume.get_all_sections_text()
-                                analysis = llm.analyze_fit(job, resume_sections)
-                                st.session_state.analysis = analysis
-
-                                subject = llm.generate_subject_line(analysis, job)
-                                st.session_state.subject = subject
-
-                                email_body = llm.write_mail(job, resume, word_limit, analysis)
-                                st.session_state.email_body = email_body
-
-                                break  # Generate email for the first job only
+                            st.session_state.results = []
+
+                            if isinstance(service, GenerationService):
+                                jobs, resume = service.prepare(resume_file, url=url_input, regenerate=regenerate)
+                                generation_span.set(jobs=len(jobs))
+                                # Every posting on the page is generated concurrently, in page order.
+                                if len(jobs) == 1 and not fused_mode:
+                                    # A single posting is streamed so the body appears as it is written.
+                                    chain = service.chain.with_cache_policy("refresh") if regenerate else service.chain
+                                    results = [stream_single_job(chain, jobs[0], resume, word_limit)]
+                                else:
+                                    results = service.generate_for(jobs, resume, word_limit, fused_mode, regenerate)
+                            else:
+                                results = service.generate(
+                                    resume_file.getvalue(), url=url_input, word_limit=word_limit,
+                                    fused=fused_mode, regenerate=regenerate,
+                                )
+                            st.session_state.results = [r for r in results if r["subject"] and r["email_body"]]
+                            for failed in (r for r in results if r["error"]):
+                                st.warning(f"Skipped {failed['job'].get('role', 'a role')}: {failed['error']}")
+
+                            if st.session_state.results:
+                                first = st.session_state.results[0]
+                                st.session_state.selected_result = 0
+                                st.session_state.analysis = first["analysis"]
+                                st.session_state.subject = first["subject"]
+                                st.session_state.email_body = first["email_body"]
 
                         if st.session_state.subject and st.session_state.email_body:
-                            st.session_state.last_email_generation = current_time
-                            st.session_state.email_generation_count += 1
-                            st.success(f"Email generated successfully! ({st.session_state.email_generation_count}/{MAX_GENERATIONS_PER_DAY} generations today)")
+                            generated = True
+                            st.success(f"Email generated successfully! ({decision.used}/{decision.limit} generations today)")
                             if st.session_state.analysis:
                                 with st.expander("📊 Generation Analysis"):
                                     st.write(f"**Strongest Overlap:** {st.session_state.analysis.get('strongest_overlap', 'N/A')}")
@@ -232,13 +280,31 @@ def main_app_logic(llm, clean_text):
                         else:
                             st.warning("Email generation incomplete. Please review and edit as necessary.")
                     else:
-                        st.error("Failed to load resume data.")
-                else:
-                    st.error("Please upload a resume before generating the email.")
-
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
-                st.info("If the error persists, please try again later or consider writing the email manually.")
+                        st.error("Please upload a resume before generating the email.")
+
+                except GenerationError as e:
+                    st.error(str(e))
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
+                    st.info("If the error persists, please try again later or consider writing the email manually.")
+                finally:
+                    # Only generations that produced an email count against the quota and cooldown.
+                    generation_span.set(generated=generated)
+                    if not generated:
+                        limiter.refund(user, decision)
+
+    if len(st.session_state.results) > 1:
+        labels = [
+            f"{r['job'].get('role', 'Role')} — {r['job'].get('company_name', 'Company')}"
+            for r in st.session_state.results
+        ]
+        selected = st.selectbox("Choose a role:", range(len(labels)), format_func=labels.__getitem__)
+        if selected != st.session_state.get('selected_result', 0):
+            chosen = st.session_state.results[selected]
+            st.session_state.selected_result = selected
+            st.session_state.analysis = chosen["analysis"]
+            st.session_state.subject = chosen["subject"]
+            st.session_state.email_body = chosen["email_body"]
 
     if st.session_state.email_body and st.session_state.subject:
         st.subheader("Review & Edit")
@@ -257,23 +323,23 @@ def main_app_logic(llm, clean_text):
                     try:
                         credentials = get_credentials()
                         if credentials:
-                            # Save the uploaded resume to a temporary file
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                                temp_file.write(resume_file.getvalue())
-                                temp_resume_path = temp_file.name
-
-                            result = send_email(
-                                credentials,
+                            # Sending happens on the outbox workers; the same email again maps to the existing job.
+                            outbox = get_outbox()
+                            outbox.register_credentials(st.session_state.user_email, credentials)
+                            _, status = outbox.enqueue(
                                 st.session_state.user_email,
-                                recipient_email, 
-                                st.session_state.subject, 
-                                st.session_state.email_body, 
-                                temp_resume_path, 
-                                resume_file.name
+                                recipient_email,
+                                st.session_state.subject,
+                                st.session_state.email_body,
+                                resume_file.getvalue(),
+                                resume_file.name,
                             )
-                            st.success(result)
-                            st.success(f"Email sent with resume: {resume_file.name}")
-                            os.remove(temp_resume_path)
+                            if status == "sent":
+                                st.info(f"This email was already sent to {recipient_email}; edit it to send another.")
+                            elif status == "sending":
+                                st.info(f"This email to {recipient_email} is already being sent.")
+                            else:
+                                st.success(f"Email to {recipient_email} queued with resume: {resume_file.name}")
                         else:
                             st.error("No valid credentials found. Please re-authenticate.")
                     except Exception as e:
@@ -283,7 +349,36 @@ def main_app_logic(llm, clean_text):
         else:
             st.error("Email sending is not available. Please upgrade permissions or copy the email content manually.")
 
-    st.info(f"Email generations remaining today: {MAX_GENERATIONS_PER_DAY - st.session_state.email_generation_count}")
+    if st.session_state.get('can_send_email', False) and st.session_state.user_email:
+        show_outbox_status()
+
+    st.info(f"Email generations remaining today: {limiter.remaining(rate_limit_user())}")
+
+def show_outbox_status():
+    outbox = get_outbox()
+    credentials = get_credentials()
+    if credentials:
+        # Jobs queued before a restart resume once their sender's credentials are registered again.
+        outbox.register_credentials(st.session_state.user_email, credentials)
+    jobs = outbox.jobs_for(st.session_state.user_email, limit=10)
+    if not jobs:
+        return
+    with st.expander("📤 Outbox", expanded=any(job["status"] in ("queued", "sending") for job in jobs)):
+        st.button("Refresh status")
+        st.dataframe(
+            [
+                {
+                    "To": job["recipient"],
+                    "Subject": job["subject"],
+                    "Status": job["status"],
+                    "Attempts": job["attempts"],
+                    "Updated": time.strftime("%H:%M:%S", time.localtime(job["updated_at"])),
+                    "Error": job["error"] or "",
+                }
+                for job in jobs
+            ],
+            use_container_width=True,
+        )
 
 def logout():
     for key in list(st.session_state.keys()):
@@ -291,6 +386,6 @@ def logout():
     st.rerun()
 
 if __name__ == "__main__":
-    chain = Chain()
     st.set_page_config(layout="wide", page_title="Cold Email Generator", page_icon="📧")
-    create_streamlit_app(chain, clean_text)
\ No newline at end of file
+    start_metrics_server()
+    create_streamlit_app(clean_text)
\ No newline at end of file
@@ -0,0 +1,332 @@
+import hashlib
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from utils import data_path
+
+QUEUED, SENDING, SENT, FAILED = "queued", "sending", "sent", "failed"
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def idempotency_key(sender, recipient, subject, body, attachment=None):
+    """Default key: the same email to the same recipient is only ever queued once."""
+    digest = hashlib.sha256()
+    for part in (sender or "", recipient, subject, body):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    if attachment is not None:
+        digest.update(hashlib.sha256(attachment).digest())
+    return digest.hexdigest()
+
+
+def is_retryable(error):
+    """True for Gmail rate limiting (429), server errors (5xx) and network failures."""
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(getattr(error, "resp", None), "status", None)
+    if isinstance(status, str) and status.isdigit():
+        status = int(status)
+    if isinstance(status, int):
+        return status in _RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class SendRateLimiter:
+    """Token bucket per sender: at most ``per_minute`` sends a minute, bursting to ``burst``."""
+
+    def __init__(self, per_minute, burst=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.burst = burst or max(1, int(per_minute // 6))
+        self.clock = clock
+        self._buckets = {}  # sender -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def try_acquire(self, sender):
+        """Take a token and return 0, or return the seconds until one is available."""
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(sender, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[sender] = (tokens - 1, now)
+                return 0.0
+            self._buckets[sender] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+
+def _gmail_send(job, credentials):
+    from email_services import get_gmail_sender
+
+    return get_gmail_sender(credentials).send(
+        job["recipient"], job["subject"], job["body"], job["attachment"], job["attachment_name"],
+        sender_email=job["sender"],
+    )
+
+
+class Outbox:
+    """
+    Durable outbound email queue: a SQLite job table drained by a pool of worker threads.
+
+    Jobs are deduplicated by idempotency key, retried with jittered exponential backoff
+    on 429 / 5xx / network errors, and paced per sender. OAuth credentials are never
+    written to disk: senders register them in memory, and a sender's jobs wait in the
+    queue until credentials for it are registered in this process.
+
+    Several processes may share one database. A claimed job carries a lease (owner and
+    expiry); only a job whose lease has expired, because its owner died mid-send, is
+    picked up again by another worker.
+    """
+
+    def __init__(self, path, workers=2, max_attempts=5, base_delay=2.0, max_delay=300.0,
+                 sender_rate_per_minute=20, poll_interval=1.0, lease_seconds=300.0, send=None):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.rate_limiter = SendRateLimiter(sender_rate_per_minute)
+        self._send = send or _gmail_send
+        self._credentials = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                sender TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                attachment BLOB,
+                attachment_name TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                message_id TEXT,
+                error TEXT,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        for column, kind in (("lease_owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt_at)")
+
+    def register_credentials(self, sender, credentials):
+        """Make ``credentials`` available to the workers for jobs sent as ``sender``."""
+        with self._lock:
+            self._credentials[sender] = credentials
+        self._notify()
+
+    def enqueue(self, sender, recipient, subject, body, attachment=None, attachment_name=None, key=None):
+        """
+        Queue an email and return ``(job_id, status)``.
+
+        Enqueuing the same idempotency key again (e.g. a double click) does not send
+        twice: it returns the existing job and its status, so the caller can report that
+        the email was already queued or sent. A job that failed for good is re-queued.
+        """
+        key = key or idempotency_key(sender, recipient, subject, body, attachment)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status FROM outbox WHERE idempotency_key = ?", (key,)
+                ).fetchone()
+                status = QUEUED
+                if row is None:
+                    job_id = self._conn.execute(
+                        "INSERT INTO outbox (idempotency_key, sender, recipient, subject, body, attachment, "
+                        "attachment_name, status, next_attempt_at, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, sender, recipient, subject, body, attachment, attachment_name, QUEUED, now, now, now),
+                    ).lastrowid
+                else:
+                    job_id, status = row["id"], row["status"]
+                    if status == FAILED:
+                        status = QUEUED
+                        self._conn.execute(
+                            "UPDATE outbox SET status = ?, attempts = 0, error = NULL, attachment = ?, "
+                            "next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                            (QUEUED, attachment, now, now, job_id),
+                        )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        self._notify()
+        return job_id, status
+
+    def job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, sender, recipient, subject, status, attempts, message_id, error, created_at, updated_at "
+                "FROM outbox WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def jobs_for(self, sender, limit=20):
+        """Most recent jobs of ``sender`` (without bodies or attachments), newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, recipient, subject, status, attempts, message_id, error, created_at, updated_at "
+                "FROM outbox WHERE sender = ? ORDER BY id DESC LIMIT ?", (sender, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"outbox-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _notify(self):
+        with self._wake:
+            self._wake.notify_all()
+
+    def _claim(self):
+        """
+        Lease the next due job of a sender with credentials and return it: a queued job,
+        or one left in "sending" whose lease expired (its worker crashed or was killed).
+        """
+        now = time.time()
+        with self._lock:
+            senders = list(self._credentials)
+            if not senders:
+                return None
+            placeholders = ",".join("?" * len(senders))
+            claimed = None
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in self._conn.execute(
+                    "SELECT * FROM outbox WHERE next_attempt_at <= ? AND (status = ? OR "
+                    "(status = ? AND (lease_expires_at IS NULL OR lease_expires_at <= ?))) "
+                    f"AND sender IN ({placeholders}) ORDER BY next_attempt_at LIMIT 16",
+                    (now, QUEUED, SENDING, now, *senders),
+                ).fetchall():
+                    wait = self.rate_limiter.try_acquire(row["sender"])
+                    if wait:
+                        # Over the sender's ceiling: push the job back without spending an attempt.
+                        self._conn.execute(
+                            "UPDATE outbox SET next_attempt_at = ? WHERE id = ?", (now + wait, row["id"])
+                        )
+                        continue
+                    self._conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                        "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                        (SENDING, self.owner, now + self.lease_seconds, now, row["id"]),
+                    )
+                    job = dict(row)
+                    job["attempts"] += 1
+                    claimed = job, self._credentials[row["sender"]]
+                    break
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return claimed
+
+    def _finish(self, job_id, status, message_id=None, error=None, next_attempt_at=None):
+        # Only the lease holder may settle a job; if the lease ran out and another worker
+        # took the job over, its outcome wins.
+        now = time.time()
+        with self._lock:
+            if status == QUEUED:
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, error = ?, next_attempt_at = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                    (status, error, next_attempt_at, now, job_id, self.owner),
+                )
+            else:
+                # The resume is only kept while the job may still be sent.
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, message_id = ?, error = ?, attachment = NULL, lease_owner = NULL, "
+                    "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                    (status, message_id, error, now, job_id, self.owner),
+                )
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def process_one(self):
+        """Send the next due job, if any; returns whether one was attempted."""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+        job, credentials = claimed
+        try:
+            message_id = self._send(job, credentials)
+        except Exception as e:
+            if is_retryable(e) and job["attempts"] < self.max_attempts:
+                self._finish(job["id"], QUEUED, error=str(e), next_attempt_at=time.time() + self.backoff(job["attempts"]))
+            else:
+                self._finish(job["id"], FAILED, error=str(e))
+        else:
+            self._finish(job["id"], SENT, message_id=message_id)
+        return True
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                if self.process_one():
+                    continue
+            except sqlite3.Error:
+                pass  # e.g. the database is busy; try again after the poll interval
+            with self._wake:
+                self._wake.wait(self.poll_interval)
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Process-wide Outbox with its workers started (OUTBOX_* environment variables)."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox(
+                    os.getenv("OUTBOX_PATH") or data_path("outbox.sqlite3"),
+                    workers=int(os.getenv("OUTBOX_WORKERS", "2")),
+                    max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5")),
+                    base_delay=float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "2")),
+                    max_delay=float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "300")),
+                    sender_rate_per_minute=float(os.getenv("OUTBOX_SENDER_RATE", "20")),
+                    lease_seconds=float(os.getenv("OUTBOX_LEASE_SECONDS", "300")),
+                ).start()
+    return _outbox
@@ -0,0 +1,179 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import PyPDF2
+
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+MAX_CHARS_PER_PAGE = int(os.getenv("PDF_MAX_CHARS_PER_PAGE", "20000"))
+MAX_TOTAL_CHARS = int(os.getenv("PDF_MAX_TOTAL_CHARS", "100000"))
+# Below this many pages, process start-up and pickling cost more than they save.
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "20"))
+POOL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn keeps workers independent of the parent's torch / thread state.
+                _pool = ProcessPoolExecutor(
+                    max_workers=POOL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _page_text(page, max_chars):
+    return (page.extract_text() or "")[:max_chars]
+
+
+def _extract_range(pdf_bytes, start, stop, max_chars):
+    """Worker entry point: text of pages [start, stop) of a PDF given as bytes."""
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return [_page_text(reader.pages[i], max_chars) for i in range(start, stop)]
+
+
+def _as_stream(source):
+    """A seekable binary stream over ``source`` without copying the upload when possible."""
+    if hasattr(source, "seek") and hasattr(source, "read"):
+        source.seek(0)
+        return source
+    return io.BytesIO(source)
+
+
+def _as_bytes(source):
+    """The upload as ``bytes`` for the worker processes, copying only when it is not already bytes."""
+    if isinstance(source, bytes):
+        return source
+    if hasattr(source, "getvalue"):
+        # BytesIO (and Streamlit's UploadedFile) hand back their buffer without a copy while it is unmodified.
+        return source.getvalue()
+    return bytes(source)
+
+
+def _run_until(deadline, fn):
+    """
+    Run ``fn(stop)`` on a helper thread until it returns or ``deadline`` passes, then
+    set ``stop``. PyPDF2 cannot be interrupted mid-page, so a thread still running at
+    the deadline is abandoned; ``fn`` checks ``stop`` to discard its late output.
+    Re-raises what ``fn`` raised and returns whether it finished in time.
+    """
+    stop = threading.Event()
+    errors = []
+
+    def run():
+        try:
+            fn(stop)
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=run, name="pdf-extract", daemon=True)
+    worker.start()
+    worker.join(max(0.0, deadline - time.monotonic()))
+    stop.set()
+    if errors:
+        raise errors[0]
+    return not worker.is_alive()
+
+
+def extract_pages(source, max_pages=None, max_chars_per_page=None, max_total_chars=None):
+    """
+    Return the text of each page (capped) of a PDF upload, bytes or memoryview.
+
+    Pages past ``max_pages`` are ignored, each page is truncated to
+    ``max_chars_per_page`` and extraction stops early once ``max_total_chars``
+    is reached. Large documents are split across a process pool.
+
+    The whole extraction, opening the document included, shares one
+    PDF_EXTRACT_TIMEOUT deadline; when it passes, the pages extracted so far
+    (in order) are returned. Errors raised while parsing are propagated.
+    """
+    max_pages = max_pages or MAX_PAGES
+    max_chars_per_page = max_chars_per_page or MAX_CHARS_PER_PAGE
+    max_total_chars = max_total_chars or MAX_TOTAL_CHARS
+    deadline = time.monotonic() + EXTRACT_TIMEOUT
+
+    readers = []
+    if not _run_until(deadline, lambda stop: readers.append(PyPDF2.PdfReader(_as_stream(source)))):
+        return []
+    reader = readers[0]
+    n_pages = min(len(reader.pages), max_pages)
+
+    if n_pages >= PARALLEL_MIN_PAGES:
+        try:
+            return _extract_parallel(_as_bytes(source), n_pages, max_chars_per_page, max_total_chars, deadline)
+        except (BrokenProcessPool, OSError, RuntimeError):
+            _reset_pool()  # fall through to the in-process path
+
+    return _extract_serial(reader, n_pages, max_chars_per_page, max_total_chars, deadline)
+
+
+def _extract_serial(reader, n_pages, max_chars_per_page, max_total_chars, deadline):
+    """In-process extraction, returning the pages done by the deadline (see _run_until)."""
+    pages = []
+
+    def run(stop):
+        total = 0
+        for i in range(n_pages):
+            if stop.is_set():
+                return
+            text = _page_text(reader.pages[i], max_chars_per_page)
+            if stop.is_set():
+                return
+            pages.append(text)
+            total += len(text)
+            if total >= max_total_chars:
+                return
+
+    _run_until(deadline, run)
+    return list(pages)
+
+
+def _extract_parallel(pdf_bytes, n_pages, max_chars_per_page, max_total_chars, deadline):
+    pool = _get_pool()
+    n_chunks = min(n_pages, POOL_WORKERS * 2)
+    bounds = [round(i * n_pages / n_chunks) for i in range(n_chunks + 1)]
+    futures = [
+        pool.submit(_extract_range, pdf_bytes, start, stop, max_chars_per_page)
+        for start, stop in zip(bounds, bounds[1:]) if start < stop
+    ]
+    pages = []
+    total = 0
+    try:
+        for future in futures:
+            for text in future.result(timeout=max(0.0, deadline - time.monotonic())):
+                pages.append(text)
+                total += len(text)
+                if total >= max_total_chars:
+                    return pages
+    except FutureTimeoutError:
+        # Keep whatever was extracted in order. The pool is shared with concurrent requests, so
+        # only this request's queued chunks are cancelled; a chunk already running finishes on its own.
+        pass
+    finally:
+        for future in futures:
+            future.cancel()
+    return pages
+
+
+def extract_text(source, **limits):
+    pages = extract_pages(source, **limits)
+    return "".join(page + "\n" for page in pages)
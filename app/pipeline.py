@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import tracing
+
+DEFAULT_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "4"))
+DEFAULT_JOB_TIMEOUT = float(os.getenv("PIPELINE_JOB_TIMEOUT", "90"))
+
+
+def generate_for_job(llm, job, resume, word_limit, resume_sections=None, fused=None):
+    """Run analyze_fit -> generate_subject_line -> write_mail (or the fused path) for a single job."""
+    with tracing.span("pipeline.job", role=job.get("role")) as span:
+        result = llm.generate_email(job, resume, word_limit, resume_sections, fused=fused)
+        span.set(mode=result.get("mode"))
+    return dict(result, job=job, error=None)
+
+
+def generate_for_jobs(llm, jobs, resume, word_limit, max_workers=None, timeout=None, fused=None):
+    """
+    Generate an email for every job concurrently on a bounded thread pool.
+
+    Results come back in the same order as ``jobs``. A job that raises or runs
+    longer than ``timeout`` seconds (measured from when it starts) gets a
+    result with ``error`` set instead of blocking the rest.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    timeout = timeout or DEFAULT_JOB_TIMEOUT
+    resume_sections = resume.get_all_sections_text()
+
+    started = {}
+
+    def run(i, job):
+        started[i] = time.monotonic()
+        return generate_for_job(llm, job, resume, word_limit, resume_sections, fused)
+
+    results = [None] * len(jobs)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)), thread_name_prefix="email-pipeline")
+    try:
+        # Each worker runs in a copy of the caller's context so its spans nest under the caller's.
+        futures = {executor.submit(contextvars.copy_context().run, run, i, job): i for i, job in enumerate(jobs)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = _failed(jobs[i], f"{type(e).__name__}: {e}")
+
+            now = time.monotonic()
+            for future in list(pending):
+                i = futures[future]
+                if i in started and now - started[i] > timeout:
+                    # Threads cannot be interrupted; the late result is simply discarded.
+                    pending.discard(future)
+                    results[i] = _failed(jobs[i], f"Timed out after {timeout:.0f}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _failed(job, error):
+    return {"job": job, "analysis": None, "subject": "", "email_body": "", "mode": None, "error": error}
+
+
+async def agenerate_for_jobs(llm, jobs, resume, word_limit, timeout=None, fused=None):
+    """
+    Async variant of ``generate_for_jobs`` built on the ``Chain.a*`` methods.
+
+    Concurrency is bounded by the shared LLM runtime rather than a thread pool.
+    """
+    jobs = list(jobs)
+    timeout = timeout or DEFAULT_JOB_TIMEOUT
+    resume_sections = resume.get_all_sections_text()
+
+    async def run(job):
+        with tracing.span("pipeline.job", role=job.get("role")) as span:
+            result = await llm.agenerate_email(job, resume, word_limit, resume_sections, fused=fused)
+            span.set(mode=result.get("mode"))
+        return dict(result, job=job, error=None)
+
+    async def run_with_timeout(job):
+        try:
+            return await asyncio.wait_for(run(job), timeout)
+        except asyncio.TimeoutError:
+            return _failed(job, f"Timed out after {timeout:.0f}s")
+        except Exception as e:
+            return _failed(job, f"{type(e).__name__}: {e}")
+
+    return list(await asyncio.gather(*(run_with_timeout(job) for job in jobs)))
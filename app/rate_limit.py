@@ -0,0 +1,346 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from utils import data_path
+
+DAY_SECONDS = 24 * 3600
+
+
+@dataclass
+class Decision:
+    """Outcome of RateLimiter.acquire; pass it back to refund() if the generation fails."""
+
+    allowed: bool
+    used: int
+    limit: int
+    reason: str = None  # "cooldown" or "quota" when not allowed
+    retry_after: float = 0.0
+    day: str = None
+    acquired_at: float = None
+    previous_at: float = None
+
+    @property
+    def remaining(self):
+        return max(0, self.limit - self.used)
+
+
+def utc_day(now):
+    return time.strftime("%Y-%m-%d", time.gmtime(now))
+
+
+def seconds_until_next_day(now):
+    return DAY_SECONDS - now % DAY_SECONDS
+
+
+def _check(count, last_at, now, cooldown, limit):
+    """(reason, retry_after) for a user who has used ``count`` today, last at ``last_at``."""
+    if last_at is not None and now - last_at < cooldown:
+        return "cooldown", cooldown - (now - last_at)
+    if count >= limit:
+        return "quota", seconds_until_next_day(now)
+    return None, 0.0
+
+
+class MemoryBackend:
+    """Per-process quota store; shared by every session of one replica."""
+
+    def __init__(self):
+        self._state = {}  # key -> [day, count, last_at]
+        self._lock = threading.Lock()
+
+    def acquire(self, key, now, cooldown, limit):
+        day = utc_day(now)
+        with self._lock:
+            state = self._state.get(key)
+            count = state[1] if state and state[0] == day else 0
+            last_at = state[2] if state else None
+            reason, retry_after = _check(count, last_at, now, cooldown, limit)
+            if reason is None:
+                count += 1
+                self._state[key] = [day, count, now]
+            return Decision(reason is None, count, limit, reason, retry_after, day, now, last_at)
+
+    def refund(self, key, decision):
+        with self._lock:
+            state = self._state.get(key)
+            if state and state[0] == decision.day:
+                state[1] = max(0, state[1] - 1)
+                if state[2] == decision.acquired_at:
+                    state[2] = decision.previous_at
+
+    def used(self, key, now):
+        with self._lock:
+            state = self._state.get(key)
+            return state[1] if state and state[0] == utc_day(now) else 0
+
+
+class SQLiteBackend:
+    """
+    Quota store in a SQLite file, so every replica (or process) sharing the file
+    sees the same counts. ``BEGIN IMMEDIATE`` makes check-and-increment atomic.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS quotas (
+                key TEXT PRIMARY KEY,
+                day TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                last_at REAL
+            )
+            """
+        )
+        self._lock = threading.Lock()
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _row(self, key):
+        return self._conn.execute("SELECT day, count, last_at FROM quotas WHERE key = ?", (key,)).fetchone()
+
+    def acquire(self, key, now, cooldown, limit):
+        day = utc_day(now)
+
+        def run():
+            row = self._row(key)
+            count = row[1] if row and row[0] == day else 0
+            last_at = row[2] if row else None
+            reason, retry_after = _check(count, last_at, now, cooldown, limit)
+            if reason is None:
+                count += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO quotas (key, day, count, last_at) VALUES (?, ?, ?, ?)",
+                    (key, day, count, now),
+                )
+            return Decision(reason is None, count, limit, reason, retry_after, day, now, last_at)
+
+        return self._transaction(run)
+
+    def refund(self, key, decision):
+        def run():
+            row = self._row(key)
+            if row and row[0] == decision.day:
+                last_at = decision.previous_at if row[2] == decision.acquired_at else row[2]
+                self._conn.execute(
+                    "UPDATE quotas SET count = ?, last_at = ? WHERE key = ?",
+                    (max(0, row[1] - 1), last_at, key),
+                )
+
+        self._transaction(run)
+
+    def used(self, key, now):
+        with self._lock:
+            row = self._row(key)
+        return row[1] if row and row[0] == utc_day(now) else 0
+
+
+# KEYS: cooldown, count. ARGV: now, cooldown seconds, daily limit, count TTL seconds.
+# Returns {status, count, cooldown ms left, previous acquire time}; status 0 = allowed,
+# 1 = cooldown, 2 = quota.
+_ACQUIRE_SCRIPT = """
+local count = tonumber(redis.call('GET', KEYS[2]) or '0')
+local cooldown_ms = math.ceil(tonumber(ARGV[2]) * 1000)
+local previous = redis.call('GET', KEYS[1])
+if cooldown_ms > 0 and previous then
+    return {1, count, redis.call('PTTL', KEYS[1]), previous}
+end
+if count >= tonumber(ARGV[3]) then
+    return {2, count, 0, false}
+end
+count = redis.call('INCR', KEYS[2])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+end
+if cooldown_ms > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', cooldown_ms)
+end
+return {0, count, 0, previous}
+"""
+
+# KEYS: cooldown, count. ARGV: the refunded acquire time. Drops the cooldown only
+# if no later acquire has replaced it.
+_REFUND_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') > 0 then
+    redis.call('DECR', KEYS[2])
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """
+    Quota store on Redis (or anything speaking its commands): the cooldown is a key
+    holding the last acquire time that expires with the cooldown, and the daily count
+    a per-day key that expires after the day ends. The check-and-increment runs as
+    one Lua script, so concurrent workers cannot exceed the limit or skip a cooldown.
+    """
+
+    def __init__(self, client, prefix="ratelimit"):
+        self.client = client
+        self.prefix = prefix
+
+    def _keys(self, key, day):
+        return f"{self.prefix}:{key}:cooldown", f"{self.prefix}:{key}:{day}"
+
+    def acquire(self, key, now, cooldown, limit):
+        day = utc_day(now)
+        status, count, cooldown_ms, previous = self.client.eval(
+            _ACQUIRE_SCRIPT, 2, *self._keys(key, day),
+            repr(float(now)), cooldown, limit, int(seconds_until_next_day(now)) + 60,
+        )
+        previous_at = float(previous) if previous else None
+        if status == 1:
+            retry_after = cooldown_ms / 1000 if cooldown_ms > 0 else cooldown
+            return Decision(False, count, limit, "cooldown", retry_after, day, now, previous_at)
+        if status == 2:
+            return Decision(False, count, limit, "quota", seconds_until_next_day(now), day, now, previous_at)
+        return Decision(True, count, limit, None, 0.0, day, now, previous_at)
+
+    def refund(self, key, decision):
+        self.client.eval(_REFUND_SCRIPT, 2, *self._keys(key, decision.day), repr(float(decision.acquired_at)))
+
+    def used(self, key, now):
+        return int(self.client.get(self._keys(key, utc_day(now))[1]) or 0)
+
+
+class FakeRedis:
+    """
+    In-process stand-in for the Redis calls RedisBackend makes (for local runs):
+    ``eval`` runs a Python equivalent of each known script under one lock, the way
+    Redis runs a script without interleaving other commands.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._data = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self._scripts = {_ACQUIRE_SCRIPT: self._acquire, _REFUND_SCRIPT: self._refund}
+
+    def _live(self, name):
+        item = self._data.get(name)
+        if item is not None and item[1] is not None and item[1] <= self._clock():
+            del self._data[name]
+            return None
+        return item
+
+    def _value(self, name):
+        item = self._live(name)
+        return None if item is None else str(item[0]).encode()
+
+    def get(self, name):
+        with self._lock:
+            return self._value(name)
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def eval(self, script, numkeys, *keys_and_args):
+        with self._lock:
+            return self._scripts[script](keys_and_args[:numkeys], [str(arg) for arg in keys_and_args[numkeys:]])
+
+    def _acquire(self, keys, args):
+        cooldown_key, count_key = keys
+        now = self._clock()
+        count = int(self._value(count_key) or 0)
+        cooldown_ms = math.ceil(float(args[1]) * 1000)
+        previous = self._value(cooldown_key)
+        if cooldown_ms > 0 and previous:
+            return [1, count, int((self._live(cooldown_key)[1] - now) * 1000), previous]
+        if count >= int(args[2]):
+            return [2, count, 0, None]
+        count += 1
+        item = self._live(count_key)
+        self._data[count_key] = (count, item[1] if item else now + int(args[3]))
+        if cooldown_ms > 0:
+            self._data[cooldown_key] = (args[0], now + cooldown_ms / 1000)
+        return [0, count, 0, previous]
+
+    def _refund(self, keys, args):
+        cooldown_key, count_key = keys
+        item = self._live(count_key)
+        if item and int(item[0]) > 0:
+            self._data[count_key] = (int(item[0]) - 1, item[1])
+        if self._value(cooldown_key) == args[0].encode():
+            del self._data[cooldown_key]
+        return 0
+
+
+class RateLimiter:
+    """
+    Per-user generation limits: a cooldown between generations and a quota per UTC day.
+
+    Every check is O(1) and atomic in the backend, so concurrent sessions (and
+    replicas sharing a SQLite file or Redis) cannot hand out extra quota.
+    """
+
+    def __init__(self, backend, cooldown_seconds=60, daily_limit=5, clock=time.time):
+        self.backend = backend
+        self.cooldown_seconds = cooldown_seconds
+        self.daily_limit = daily_limit
+        self.clock = clock
+
+    def acquire(self, user):
+        """Reserve one generation for ``user``; check ``.allowed`` on the returned Decision."""
+        return self.backend.acquire(user, self.clock(), self.cooldown_seconds, self.daily_limit)
+
+    def refund(self, user, decision):
+        """Give back a generation that produced nothing, including its cooldown."""
+        if decision.allowed:
+            self.backend.refund(user, decision)
+
+    def remaining(self, user):
+        return max(0, self.daily_limit - self.backend.used(user, self.clock()))
+
+
+def create_backend(name=None):
+    name = name or os.getenv("RATE_LIMIT_BACKEND", "memory")
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(os.getenv("RATE_LIMIT_SQLITE_PATH") or data_path("rate_limit.sqlite3"))
+    if name == "redis":
+        import redis
+
+        return RedisBackend(redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    if name == "fake-redis":
+        return RedisBackend(FakeRedis())
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}; expected memory, sqlite, redis or fake-redis.")
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Process-wide RateLimiter (EMAIL_GENERATION_COOLDOWN seconds, MAX_GENERATIONS_PER_DAY per day)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    create_backend(),
+                    cooldown_seconds=float(os.getenv("EMAIL_GENERATION_COOLDOWN", "60")),
+                    daily_limit=int(os.getenv("MAX_GENERATIONS_PER_DAY", "5")),
+                )
+    return _limiter
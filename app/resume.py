@@ -1,18 +1,107 @@
-import streamlit as st
-import PyPDF2
-import io
+import logging
+import pdf_text
 import re
-import torch
-from sentence_transformers import SentenceTransformer
 import warnings
+from embeddings import get_embedding_service
+from resume_index import ResumeIndex
+from resume_cache import ParsedResume, file_digest, get_resume_cache
+import tracing
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-@st.cache_resource
+logger = logging.getLogger(__name__)
+
 def load_sentence_transformer_model():
-    model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-    model = model.to('cpu')
-    return model
+    return get_embedding_service()
+
+# Canonical section -> header spellings seen in real resumes.
+SECTION_SYNONYMS = {
+    "Personal Information": ["Personal Information", "Personal Details", "Contact Information", "Contact Details", "Contact"],
+    "Summary": ["Summary", "Professional Summary", "Profile", "Professional Profile", "Objective", "Career Objective", "About Me"],
+    "Skills": ["Skills", "Technical Skills", "Key Skills", "Core Competencies", "Technologies", "Tech Stack"],
+    "Experience": ["Experience", "Work Experience", "Professional Experience", "Work History", "Employment History", "Employment", "Internships"],
+    "Education": ["Education", "Academic Background", "Academics", "Educational Qualifications"],
+    "Projects": ["Projects", "Personal Projects", "Academic Projects", "Key Projects"],
+    "Certifications": ["Certifications", "Certificates", "Licenses & Certifications", "Courses"],
+    "Links": ["Links", "Profiles", "Online Profiles"],
+}
+_TEXT_SECTIONS = ("Personal Information", "Summary")
+
+
+# Words that may follow a header keyword ("Skills Summary", "Summary of Qualifications").
+_HEADER_QUALIFIERS = ["Summary", "Highlights", "Overview", "Details", "Qualifications", "History", "Profile", "Section"]
+# Other section names a combined header may pair with ("Skills & Tools", "Education and Training").
+_HEADER_COMPANIONS = [
+    "Achievements", "Awards", "Activities", "Interests", "Hobbies", "Languages", "Tools", "Training",
+    "Publications", "Leadership", "Volunteering", "Frameworks", "Expertise", "Coursework", "Abilities",
+]
+
+
+def _alternation(words):
+    # Longest spelling first so "Work Experience" wins over "Experience".
+    return "|".join(re.escape(w).replace(r"\ ", r"\s+") for w in sorted(set(words), key=len, reverse=True))
+
+
+def _compile_header_matcher():
+    groups = [f"(?P<s{i}>{_alternation(synonyms)})" for i, synonyms in enumerate(SECTION_SYNONYMS.values())]
+    companions = _alternation([s for synonyms in SECTION_SYNONYMS.values() for s in synonyms]
+                              + _HEADER_QUALIFIERS + _HEADER_COMPANIONS)
+    year = r"(?:19|20)\d{2}|present|current"
+    qualifier = (
+        r"(?:\s*\([^()]{0,40}\)"                                              # "(Selected)"
+        r"|\s+(?:of\s+)?(?:" + _alternation(_HEADER_QUALIFIERS) + r")\b"      # "Summary", "of Qualifications"
+        r"|\s*(?:&|\+|/|,|\band\b)\s*(?:" + companions + r")\b"              # "& Tools", "and Projects"
+        r"|\s+(?:" + year + r")(?:\s*[-–—]\s*(?:" + year + r"))?\b)"           # "2019-2021"
+    )
+    # A header is the whole line: a keyword ending on a word boundary, up to three qualifiers,
+    # then optionally ": inline content". Anything else is body text and is kept as such.
+    return re.compile(
+        r"^[^\w]*(?:" + "|".join(groups) + r")\b" + qualifier + r"{0,3}\s*(?:[:|\-–—]\s*(?P<rest>.*))?$",
+        re.IGNORECASE,
+    )
+
+
+_HEADER_RE = _compile_header_matcher()
+_SECTION_BY_GROUP = {f"s{i}": name for i, name in enumerate(SECTION_SYNONYMS)}
+_SKILL_SPLIT_RE = re.compile(r"[,;]")
+
+
+def parse_resume_sections(text):
+    """
+    Split resume text into sections in a single pass over its lines.
+
+    Returns a new dict each call (empty sections omitted); text sections are
+    strings and the rest are lists, with Skills split on commas/semicolons.
+    """
+    collected = {name: [] for name in SECTION_SYNONYMS}
+    current = collected["Personal Information"]
+    is_skills = False
+
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        match = _HEADER_RE.match(line)
+        if match:
+            name = _SECTION_BY_GROUP.get(match.lastgroup) or next(
+                name for group, name in _SECTION_BY_GROUP.items() if match.group(group)
+            )
+            current = collected[name]
+            is_skills = name == "Skills"
+            line = (match.group("rest") or "").strip()
+            if not line:
+                continue
+        if is_skills:
+            current.extend(skill.strip() for skill in _SKILL_SPLIT_RE.split(line) if skill.strip())
+        else:
+            current.append(line)
+
+    sections = {}
+    for name, items in collected.items():
+        if not items:
+            continue
+        sections[name] = "".join(item + "\n" for item in items) if name in _TEXT_SECTIONS else items
+    return sections
 
 class Resume:
     def __init__(self):
@@ -28,71 +117,73 @@ class Resume:
             "Certifications": [],
             "Links": []
         }
-        self.embeddings = None
-
-    @st.cache_data
-    def _create_embeddings(_self, text):
-        embeddings = {}
-        for section, content in _self.sections.items():
-            if isinstance(content, list):
-                with torch.no_grad():
-                    embeddings[section] = _self.model.encode(content, show_progress_bar=False)
-            else:
-                with torch.no_grad():
-                    embeddings[section] = _self.model.encode([content], show_progress_bar=False)[0]
-        return embeddings
+        self.index = None
+        self._all_sections_text = None
+
+    def _create_embeddings(self, text):
+        # Repeat resume lines are served from the shared embedding cache.
+        return ResumeIndex.from_sections(self.sections, self.model)
 
     def load_resume(self, uploaded_file):
         if uploaded_file is not None:
             try:
-                self.data = self.extract_text_from_pdf(uploaded_file)
-                self.split_resume_sections(self.data)
-                self.embeddings = self._create_embeddings(self.data)
-                return self.sections
+                with tracing.span("resume.load"):
+                    cache = get_resume_cache()
+                    key = cache.key(self.model.cache_name, file_digest(uploaded_file))
+                    cached = cache.get(key)
+                    tracing.record_cache("resume", cached is not None)
+                    if cached is not None:
+                        self._restore(cached)
+                        return self.sections
+
+                    with tracing.span("resume.extract_pdf") as span:
+                        self.data = self.extract_text_from_pdf(uploaded_file)
+                        span.set(chars=len(self.data))
+                    with tracing.span("resume.split_sections"):
+                        self.split_resume_sections(self.data)
+                    with tracing.span("resume.index"):
+                        self.index = self._create_embeddings(self.data)
+                    if self.data.strip():
+                        cache.put(key, ParsedResume(
+                            data=self.data,
+                            sections=self.sections,
+                            matrix=self.index.matrix,
+                            ids=self.index.ids,
+                            all_sections_text=self.get_all_sections_text(),
+                        ))
+                    return self.sections
             except Exception as e:
-                st.error(f"Error loading resume: {str(e)}")
+                logger.exception("Error loading resume: %s", e)
                 return None
         else:
-            st.warning("No resume file uploaded.")
+            logger.warning("No resume file uploaded.")
             return None
 
+    def _restore(self, parsed):
+        # Cached entries are shared between sessions, so each Resume gets its own section lists.
+        self.data = parsed.data
+        self.sections = {k: list(v) if isinstance(v, list) else v for k, v in parsed.sections.items()}
+        self.index = ResumeIndex(parsed.matrix, parsed.ids)
+        self._all_sections_text = parsed.all_sections_text
+
     def extract_text_from_pdf(self, uploaded_file):
         text = ""
         try:
-            pdf_file = io.BytesIO(uploaded_file.getvalue())
-            reader = PyPDF2.PdfReader(pdf_file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            # Reads the upload in place; long PDFs are capped and split across worker processes.
+            text = pdf_text.extract_text(uploaded_file)
         except Exception as e:
-            st.error(f"Error extracting text from PDF: {str(e)}")
+            logger.exception("Error extracting text from PDF: %s", e)
         return text
 
     def split_resume_sections(self, text):
-        lines = text.split('\n')
-        current_section = "Personal Information"
-
-        for line in lines:
-            line = line.strip()
-            lower_line = line.lower()
-
-            if any(keyword.lower() in lower_line for keyword in self.sections.keys()):
-                current_section = next((k for k in self.sections.keys() if k.lower() in lower_line), current_section)
-            elif line:
-                if current_section == "Skills":
-                    self.sections[current_section].extend(re.split(r'[,;]', line))
-                elif isinstance(self.sections[current_section], list):
-                    self.sections[current_section].append(line)
-                else:
-                    self.sections[current_section] += line + "\n"
-
-        # Clean up skills
-        self.sections["Skills"] = [skill.strip() for skill in self.sections["Skills"] if skill.strip()]
-        
-        # Clean up empty sections
-        self.sections = {k: v for k, v in self.sections.items() if v}
+        # Builds a fresh mapping, so calling this twice never duplicates content.
+        self.sections = parse_resume_sections(text)
+        return self.sections
 
     def get_all_sections_text(self):
         """Return all resume sections as formatted text for analysis (e.g. analyze_fit)."""
+        if self._all_sections_text is not None:
+            return self._all_sections_text
         sections_text = []
         for section, content in self.sections.items():
             if content:
@@ -103,51 +194,20 @@ class Resume:
         return "\n\n".join(sections_text)
 
     def query_resume(self, query, n_results=3):
-        with torch.no_grad():
-            query_embedding = self.model.encode([query], show_progress_bar=False)[0]
-
-        results = []
-        for section, content in self.sections.items():
-            if isinstance(content, list):
-                with torch.no_grad():
-                    similarities = torch.cosine_similarity(
-                        torch.tensor(query_embedding).unsqueeze(0),
-                        torch.tensor(self.embeddings[section]),
-                        dim=1
-                    )
-                for item, similarity in zip(content, similarities):
-                    results.append({
-                        "section": section,
-                        "content": item,
-                        "similarity": similarity.item()
-                    })
-            else:
-                if isinstance(self.embeddings[section], torch.Tensor):
-                    similarity = torch.cosine_similarity(
-                        torch.tensor(query_embedding).unsqueeze(0),
-                        torch.tensor(self.embeddings[section]).unsqueeze(0),
-                        dim=1
-                    ).item()
-                else:
-                    with torch.no_grad():
-                        similarity = torch.cosine_similarity(
-                            torch.tensor(query_embedding).unsqueeze(0),
-                            torch.tensor(self.embeddings[section]).unsqueeze(0),
-                            dim=1
-                        ).item()
-                results.append({
-                    "section": section,
-                    "content": content,
-                    "similarity": similarity
-                })
-
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-
+        query_embedding = self.model.encode([query])[0]
+        return self._format_results(self.index.search(query_embedding, k=n_results))
+
+    def query_resume_batch(self, queries, n_results=3):
+        """Score several job postings against this resume in one call; one formatted string per query."""
+        if not queries:
+            return []
+        query_embeddings = self.model.encode(list(queries))
+        return [self._format_results(results) for results in self.index.search(query_embeddings, k=n_results)]
+
+    @staticmethod
+    def _format_results(results):
         formatted_results = []
-        for result in results[:n_results]:
-            formatted_results.append(f"**{result['section']}:**\n{result['content']}")
+        for section, content, _ in results:
+            formatted_results.append(f"**{section}:**\n{content}")
 
         return "\n\n".join(formatted_results)
-
-
-
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class ParsedResume:
+    """Everything load_resume derives from a PDF, so a repeat upload can skip all of it."""
+
+    data: str
+    sections: dict
+    matrix: np.ndarray
+    ids: list
+    all_sections_text: str
+
+
+def file_digest(uploaded_file):
+    """SHA-256 of the uploaded file's bytes, hashed from a buffer view without copying."""
+    if hasattr(uploaded_file, "getbuffer"):
+        buffer = uploaded_file.getbuffer()
+    elif hasattr(uploaded_file, "getvalue"):
+        buffer = uploaded_file.getvalue()
+    else:
+        buffer = uploaded_file
+    return hashlib.sha256(buffer).hexdigest()
+
+
+class ResumeCache:
+    """
+    Bounded per-process LRU of parsed resumes keyed by (embedding model, file SHA-256),
+    with an optional on-disk tier (one .npz + .json pair per resume).
+    """
+
+    def __init__(self, max_entries=64, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model_name, digest):
+        return f"{model_name}:{digest}"
+
+    def _paths(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, name)
+        return base + ".json", base + ".npz"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read_disk(key) if self.directory else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._remember(key, entry)
+        if self.directory:
+            self._write_disk(key, entry)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        json_path, npz_path = self._paths(key)
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with np.load(npz_path) as arrays:
+                matrix = arrays["matrix"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return ParsedResume(
+            data=meta["data"],
+            sections=meta["sections"],
+            matrix=matrix,
+            ids=[tuple(item) for item in meta["ids"]],
+            all_sections_text=meta["all_sections_text"],
+        )
+
+    def _write_disk(self, key, entry):
+        json_path, npz_path = self._paths(key)
+        # Write the matrix first: an entry only counts once its .json exists.
+        tmp_npz = npz_path + ".tmp.npz"
+        np.savez(tmp_npz, matrix=entry.matrix)
+        os.replace(tmp_npz, npz_path)
+        tmp_json = json_path + ".tmp"
+        with open(tmp_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "data": entry.data,
+                "sections": entry.sections,
+                "ids": entry.ids,
+                "all_sections_text": entry.all_sections_text,
+            }, f)
+        os.replace(tmp_json, json_path)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_resume_cache():
+    """Process-wide ResumeCache (RESUME_CACHE_SIZE entries; disk tier only when RESUME_CACHE_DIR is set)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResumeCache(
+                    max_entries=int(os.getenv("RESUME_CACHE_SIZE", "64")),
+                    directory=os.getenv("RESUME_CACHE_DIR") or None,
+                )
+    return _cache
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class ResumeIndex:
+    """
+    Dense retrieval index over every resume item.
+
+    ``matrix`` holds one L2-normalized float32 row per item and ``ids`` holds the
+    matching ``(section, content)`` pair, so a query is a single matrix product.
+    """
+
+    def __init__(self, matrix, ids):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.ids = list(ids)
+
+    @classmethod
+    def from_sections(cls, sections, model):
+        ids = []
+        for section, content in sections.items():
+            if isinstance(content, list):
+                ids.extend((section, item) for item in content)
+            elif content:
+                ids.append((section, content))
+        if not ids:
+            return cls(np.empty((0, 0), dtype=np.float32), ids)
+        # One batched encode for the whole resume instead of one call per section.
+        matrix = model.encode([content for _, content in ids])
+        return cls(_l2_normalize(np.asarray(matrix, dtype=np.float32)), ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query_embeddings, k=3):
+        """
+        Score one query vector or a batch of them against every resume item.
+
+        Returns a list of ``(section, content, similarity)`` tuples for a single
+        query, or a list of such lists for a 2-D batch, best match first.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        single = queries.ndim == 1
+        queries = _l2_normalize(np.atleast_2d(queries))
+
+        if not self.ids:
+            results = [[] for _ in range(queries.shape[0])]
+            return results[0] if single else results
+
+        k = min(k, len(self.ids))
+        scores = queries @ self.matrix.T
+        if k < len(self.ids):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(self.ids)), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+
+        results = [
+            [(*self.ids[j], float(scores[row, j])) for j in top[row]]
+            for row in range(queries.shape[0])
+        ]
+        return results[0] if single else results
+
+
+def _l2_normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
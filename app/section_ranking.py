@@ -0,0 +1,118 @@
+import heapq
+import os
+import re
+
+import numpy as np
+
+# What a job posting is "about"; sections are ranked by similarity to this rather
+# than to an embedding of the whole page, which the model truncates anyway.
+JOB_POSTING_QUERY = (
+    "Job posting: role title, responsibilities, requirements and qualifications, "
+    "required skills, years of experience, team, location, salary and how to apply."
+)
+
+CHUNK_WORDS = int(os.getenv("EXTRACT_CHUNK_WORDS", "200"))
+CHUNK_OVERLAP = int(os.getenv("EXTRACT_CHUNK_OVERLAP", "40"))
+# Pages up to this many words are sent whole; longer ones contribute about this many words of sections.
+MAX_WORDS = int(os.getenv("EXTRACT_MAX_WORDS", "1500"))
+# Unset (0): as many windows as fit in MAX_WORDS.
+TOP_K = int(os.getenv("EXTRACT_TOP_K", "0")) or None
+BATCH_SIZE = int(os.getenv("EXTRACT_BATCH_SIZE", "32"))
+MAX_CHUNKS = int(os.getenv("EXTRACT_MAX_CHUNKS", "2000"))
+
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_WORD_RE = re.compile(r'\S+')
+
+
+def window_chunks(text, chunk_words=None, overlap_words=None):
+    """
+    Lazily yield overlapping windows of ``text`` of at most ``chunk_words`` words.
+
+    Consecutive paragraphs (split on blank lines) are packed into the same window
+    while they fit, so a posting's title, "Requirements" line and bullets stay
+    together; a new window starts at a paragraph boundary and repeats the last
+    ``overlap_words`` words of the previous one. Paragraphs longer than a window
+    are cut into overlapping windows of their own.
+    """
+    chunk_words = chunk_words or CHUNK_WORDS
+    overlap_words = CHUNK_OVERLAP if overlap_words is None else min(overlap_words, chunk_words - 1)
+    step = max(1, chunk_words - overlap_words)
+    window = []
+    fresh = 0  # words at the end of ``window`` not yet part of a yielded chunk
+    for paragraph in _PARAGRAPH_RE.split(text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if fresh and len(window) + len(words) > chunk_words:
+            yield ' '.join(window)
+            window, fresh = (window[-overlap_words:] if overlap_words else []), 0
+        window.extend(words)
+        fresh += len(words)
+        while len(window) > chunk_words:
+            yield ' '.join(window[:chunk_words])
+            fresh = len(window) - chunk_words
+            window = window[step:]
+    if fresh:
+        yield ' '.join(window)
+
+
+def _fits(text, max_words):
+    for i, _ in enumerate(_WORD_RE.finditer(text)):
+        if i >= max_words:
+            return False
+    return True
+
+
+def _batches(iterable, size, limit):
+    batch = []
+    for i, item in enumerate(iterable):
+        if i >= limit:
+            break
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def rank_sections(text, model, top_k=None, query=JOB_POSTING_QUERY, batch_size=None,
+                  chunk_words=None, overlap_words=None, max_chunks=None, max_words=None):
+    """
+    Return the sections of ``text`` to extract jobs from, best first.
+
+    A page of at most ``max_words`` words is returned whole, as one section, so
+    every posting on it reaches the prompt. Otherwise the ``top_k`` windows most
+    similar to ``query`` are returned; by default enough of them to fill
+    ``max_words``. Chunks are encoded in fixed-size batches and only a running
+    top-k heap is kept, so peak memory depends on the batch size rather than
+    the page size.
+    """
+    max_words = max_words or MAX_WORDS
+    if _fits(text, max_words):
+        return [text.strip()] if text.strip() else []
+    chunk_words = chunk_words or CHUNK_WORDS
+    top_k = top_k or TOP_K or max(1, max_words // chunk_words)
+    batch_size = batch_size or BATCH_SIZE
+    max_chunks = max_chunks or MAX_CHUNKS
+
+    query_vector = np.asarray(model.encode(query), dtype=np.float32)
+    query_vector /= np.linalg.norm(query_vector) or 1.0
+
+    heap = []  # (score, -position, text): the weakest kept chunk sits at heap[0]
+    position = 0
+    chunks = window_chunks(text, chunk_words, overlap_words)
+    for batch in _batches(chunks, batch_size, max_chunks):
+        vectors = np.asarray(model.encode(batch), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        scores = (vectors @ query_vector) / norms
+        for chunk, score in zip(batch, scores):
+            item = (float(score), -position, chunk)
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+            position += 1
+
+    return [chunk for _, _, chunk in sorted(heap, reverse=True)]
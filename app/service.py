@@ -0,0 +1,183 @@
+import base64
+import copy
+import io
+import os
+import threading
+
+from fetcher import get_page_fetcher, html_to_text, normalize_url
+from pipeline import generate_for_jobs
+from singleflight import extraction_flight
+from structured_data import extract_job_postings
+from utils import clean_text
+import tracing
+
+
+class GenerationError(ValueError):
+    """The request could not be turned into emails (bad input, unreadable resume, no jobs)."""
+
+
+def _file(pdf):
+    """Seekable in-memory file for raw PDF bytes or an upload object."""
+    if hasattr(pdf, "getvalue"):
+        return pdf
+    if not pdf:
+        raise GenerationError("A resume PDF is required.")
+    return io.BytesIO(bytes(pdf))
+
+
+class GenerationService:
+    """
+    Framework-free generation: careers page + resume PDF in, one email per job posting out.
+
+    Wraps Chain, Resume, the page fetcher and the job pipeline so the same logic runs
+    inside Streamlit, behind the HTTP API or in a worker process.
+    """
+
+    def __init__(self, chain=None, fetcher=None, extractions=None):
+        self._chain = chain
+        self.fetcher = fetcher or get_page_fetcher()
+        # Concurrent requests for the same URL share one fetch + extract_jobs call.
+        self.extractions = extractions or extraction_flight()
+        self._lock = threading.Lock()
+
+    @property
+    def chain(self):
+        if self._chain is None:
+            with self._lock:
+                if self._chain is None:
+                    from chains import Chain
+
+                    self._chain = Chain()
+        return self._chain
+
+    def warm_up(self):
+        from embeddings import get_embedding_service
+
+        get_embedding_service().warm_up()
+        return self
+
+    def load_resume(self, pdf):
+        from resume import Resume
+
+        resume = Resume()
+        if resume.load_resume(_file(pdf)) is None:
+            raise GenerationError("Failed to load resume data.")
+        if not (resume.data or "").strip():
+            raise GenerationError("No text could be extracted from the resume PDF.")
+        return resume
+
+    def extract_jobs(self, url=None, page_text=None, regenerate=False):
+        # Regenerating must not hand back a bad extraction from the LLM cache or the result cache.
+        chain = self.chain.with_cache_policy("refresh") if regenerate else self.chain
+        if page_text is not None:
+            jobs = self._extract_jobs(page_text, chain)
+        elif url:
+            key = normalize_url(url)
+            if regenerate:
+                self.extractions.forget(key)
+            jobs, how = self.extractions.do(key, lambda: self._extract_jobs_from_url(url, chain))
+            tracing.record_cache("extract_jobs", how != "executed")
+            # Callers share the cached list, so each one gets its own copy of the job dicts.
+            jobs = copy.deepcopy(jobs)
+        else:
+            raise GenerationError("Either url or page_text is required.")
+        if not jobs:
+            raise GenerationError("No job postings found on the page.")
+        return jobs
+
+    def _extract_jobs_from_url(self, url, chain):
+        html = self.fetcher.fetch(url)
+        # schema.org JobPosting markup already has the fields; the LLM is only needed without it.
+        jobs = extract_job_postings(html)
+        return jobs or self._extract_jobs(html_to_text(html), chain)
+
+    def _extract_jobs(self, page_text, chain):
+        with tracing.span("clean_text"):
+            data = clean_text(str(page_text))
+        jobs = chain.extract_jobs(data)
+        return jobs if isinstance(jobs, list) else [jobs]
+
+    def prepare(self, resume_pdf, url=None, page_text=None, regenerate=False):
+        """Load the resume and extract the page's job postings: returns (jobs, resume)."""
+        resume = self.load_resume(resume_pdf)
+        return self.extract_jobs(url, page_text, regenerate), resume
+
+    def generate_for(self, jobs, resume, word_limit=100, fused=None, regenerate=False):
+        chain = self.chain.with_cache_policy("refresh") if regenerate else self.chain
+        return generate_for_jobs(chain, jobs, resume, word_limit, fused=fused)
+
+    def generate(self, resume_pdf, url=None, page_text=None, word_limit=100, fused=None, regenerate=False):
+        """One result dict (job, analysis, subject, email_body, mode, error) per posting, in page order."""
+        with tracing.span("generate", fused=fused, regenerate=regenerate) as span:
+            jobs, resume = self.prepare(resume_pdf, url, page_text, regenerate)
+            span.set(jobs=len(jobs))
+            return self.generate_for(jobs, resume, word_limit, fused, regenerate)
+
+    def generate_batch(self, resume_pdf, pages, word_limit=100, fused=None, regenerate=False):
+        """
+        Generate for several careers pages with one resume. ``pages`` holds dicts with
+        ``url`` or ``page_text``; a page that fails gets ``{"error": ...}`` instead of results.
+        """
+        resume = self.load_resume(resume_pdf)
+        out = []
+        for page in pages:
+            try:
+                jobs = self.extract_jobs(page.get("url"), page.get("page_text"), regenerate)
+                out.append({"results": self.generate_for(jobs, resume, word_limit, fused, regenerate), "error": None})
+            except Exception as e:
+                out.append({"results": [], "error": f"{type(e).__name__}: {e}"})
+        return out
+
+
+class RemoteGenerationService:
+    """Client for the HTTP API in api.py with the same ``generate`` signature."""
+
+    def __init__(self, base_url, token=None, timeout=None, session=None):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout or float(os.getenv("GENERATION_API_TIMEOUT", "180"))
+        self.session = session or requests.Session()
+        token = token or os.getenv("GENERATION_API_TOKEN")
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _post(self, path, payload):
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code in (400, 413):
+            raise GenerationError(response.json().get("error", "Bad request"))
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _payload(resume_pdf, word_limit, fused, regenerate):
+        data = resume_pdf.getvalue() if hasattr(resume_pdf, "getvalue") else resume_pdf
+        return {
+            "resume_pdf": base64.b64encode(bytes(data)).decode("ascii"),
+            "word_limit": word_limit,
+            "fused": fused,
+            "regenerate": regenerate,
+        }
+
+    def generate(self, resume_pdf, url=None, page_text=None, word_limit=100, fused=None, regenerate=False):
+        payload = dict(self._payload(resume_pdf, word_limit, fused, regenerate), url=url, page_text=page_text)
+        return self._post("/generate", payload)["results"]
+
+    def generate_batch(self, resume_pdf, pages, word_limit=100, fused=None, regenerate=False):
+        payload = dict(self._payload(resume_pdf, word_limit, fused, regenerate), pages=list(pages))
+        return self._post("/generate/batch", payload)["pages"]
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_generation_service():
+    """RemoteGenerationService when GENERATION_API_URL is set, otherwise the in-process GenerationService."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                api_url = os.getenv("GENERATION_API_URL")
+                _service = RemoteGenerationService(api_url) if api_url else GenerationService()
+    return _service
@@ -76,7 +76,7 @@ def add_sidebar():
         with st.expander("How is the email content generated?"):
             st.write("""
             1. **Data Processing**:
-           - Web scraping of job posting URL using WebBaseLoader
+           - Web scraping of job posting URL with a pooled, cached page fetcher
            - PDF resume parsing with advanced text extraction
            - Text cleaning and normalization of both inputs
         
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is in flight wait for it and get the same result (or the same exception).
+    Successful results are kept for ``ttl_seconds`` so the trailing burst after
+    the call finishes is served from memory; failures are never cached.
+    """
+
+    def __init__(self, ttl_seconds=60.0, max_entries=256, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._calls = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+        self.cached = 0
+
+    def do(self, key, fn):
+        """Return ``(value, how)``, where ``how`` is "executed", "shared" or "cached"."""
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.clock() < expires_at:
+                    self._results.move_to_end(key)
+                    self.cached += 1
+                    return value, "cached"
+                del self._results[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self.shared += 1
+            if call.error is not None:
+                raise call.error
+            return call.value, "shared"
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.executed += 1
+                if call.error is None and self.ttl_seconds > 0:
+                    self._results[key] = (self.clock() + self.ttl_seconds, call.value)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            call.done.set()
+        return call.value, "executed"
+
+    def forget(self, key):
+        """Drop a cached result so the next call runs again."""
+        with self._lock:
+            self._results.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._results),
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "shared": self.shared,
+                "cached": self.cached,
+            }
+
+
+def extraction_flight():
+    """A SingleFlight configured for job extraction (EXTRACT_RESULT_TTL, EXTRACT_RESULT_CACHE_SIZE)."""
+    return SingleFlight(
+        ttl_seconds=float(os.getenv("EXTRACT_RESULT_TTL", "60")),
+        max_entries=int(os.getenv("EXTRACT_RESULT_CACHE_SIZE", "256")),
+    )
@@ -1,9 +1,7 @@
-import time
-import re
 from email_services import generate_subject
 
 # Generator function for streaming email generation
-def stream_email_content(job, resume_data, llm, word_limit=100):
+def stream_email_content(job, resume_data, llm, word_limit=100, analysis=None, subject=None):
     """
     Stream the email content generation process.
 
@@ -12,24 +10,22 @@ def stream_email_content(job, resume_data, llm, word_limit=100):
         resume_data: Resume instance with ``query_resume`` (same object passed to ``Chain.write_mail``).
         llm (object): Language model for generating email content (e.g. ``Chain``).
         word_limit (int): Maximum words for the generated email body.
+        analysis (dict): Optional ``Chain.analyze_fit`` result used to steer the body.
+        subject (str): Subject line to emit first; a template subject is used when omitted.
 
     Yields:
-        str: Parts of the email content.
+        str: Parts of the email content, token by token as the model produces them.
+        Suitable for ``st.write_stream``.
     """
+    started = False
     try:
-        # Generate and stream the subject
-        subject = generate_subject(job)
-        yield f"Subject: {subject}\n\n"
-
-        # Generate the email body
-        email_body = llm.write_mail(job, resume_data, word_limit)
-        
-        # Split the email body into paragraphs and yield each paragraph
-        paragraphs = email_body.split('\n\n')
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if paragraph:
-                yield paragraph + '\n\n'
-                time.sleep(0.1)  # Simulate streaming delay
+        yield f"Subject: {subject or generate_subject(job)}\n\n"
+        for piece in llm.stream_mail(job, resume_data, word_limit, analysis):
+            started = True
+            yield piece
     except Exception as e:
-        yield f"An error occurred during email generation: {e}\n"
+        if started:
+            # Part of the body is already on screen; say it is incomplete rather than appending to it.
+            yield f"\n\n[This email was cut off by an error while it was being written: {e}]\n"
+        else:
+            yield f"An error occurred during email generation: {e}\n"
@@ -0,0 +1,167 @@
+import json
+import os
+import re
+import threading
+
+import tracing
+
+NOT_SPECIFIED = "Not specified"
+MAX_DESCRIPTION_CHARS = int(os.getenv("STRUCTURED_DESCRIPTION_CHARS", "1500"))
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class _HitRate:
+    """How many fetched pages carried usable JobPosting data (the LLM was skipped)."""
+
+    def __init__(self):
+        self.pages = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit):
+        with self._lock:
+            self.pages += 1
+            self.hits += bool(hit)
+        tracing.record_cache("structured_data", hit)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pages": self.pages,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.pages if self.pages else 0.0,
+            }
+
+
+_hit_rate = _HitRate()
+
+
+def stats():
+    return _hit_rate.stats()
+
+
+def extract_job_postings(html):
+    """
+    Job dicts (company_name, role, experience, skills, description) built from the
+    schema.org JobPosting JSON-LD or microdata embedded in ``html``; [] when there is none.
+
+    Runs on the raw HTML, before clean_text strips the markup and punctuation.
+    """
+    jobs = []
+    # Cheap pre-check: both JSON-LD and microdata name the type literally.
+    if html and "JobPosting" in html:
+        with tracing.span("extract_jobs.structured_data") as span:
+            from bs4 import BeautifulSoup
+
+            soup = BeautifulSoup(html, "html.parser")
+            postings = list(_json_ld_postings(soup)) or list(_microdata_postings(soup))
+            jobs = [job for job in map(_to_job, postings) if job["role"] != NOT_SPECIFIED]
+            span.set(postings=len(jobs))
+    _hit_rate.record(bool(jobs))
+    return jobs
+
+
+def _is_job_posting(node):
+    types = node.get("@type") if isinstance(node, dict) else None
+    types = types if isinstance(types, list) else [types]
+    return any(isinstance(t, str) and t.rsplit("/", 1)[-1].rsplit(":", 1)[-1] == "JobPosting" for t in types)
+
+
+def _json_ld_postings(soup):
+    for script in soup.find_all("script", type=re.compile(r"application/ld\+json", re.I)):
+        try:
+            data = json.loads(script.string or script.get_text() or "null", strict=False)
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(reversed(node))
+            elif isinstance(node, dict):
+                if _is_job_posting(node):
+                    yield node
+                elif "@graph" in node:
+                    stack.append(node["@graph"])
+                elif "itemListElement" in node:
+                    stack.append(node["itemListElement"])
+                elif "item" in node:
+                    stack.append(node["item"])
+
+
+def _microdata_postings(soup):
+    for scope in soup.find_all(itemscope=True, itemtype=re.compile(r"schema\.org/JobPosting", re.I)):
+        yield _microdata_item(scope)
+
+
+def _microdata_item(scope):
+    item = {}
+    for prop in scope.find_all(itemprop=True):
+        # Properties of nested items belong to those items, not to this one.
+        if prop.find_parent(itemscope=True) is not scope:
+            continue
+        value = _microdata_item(prop) if prop.has_attr("itemscope") else _microdata_value(prop)
+        for name in prop["itemprop"].split():
+            item.setdefault(name, value)
+    return item
+
+
+def _microdata_value(tag):
+    if tag.has_attr("content"):
+        return tag["content"]
+    if tag.name in ("a", "link") and tag.has_attr("href"):
+        return tag["href"]
+    return tag.get_text(" ", strip=True)
+
+
+def _text(value):
+    """Plain text of a JSON-LD value: strings are de-HTML'd, lists joined, objects reduced to their name."""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(filter(None, (_text(v) for v in value)))
+    if isinstance(value, dict):
+        return _text(value.get("name") or value.get("description") or value.get("@value"))
+    value = str(value)
+    if "<" in value:
+        from bs4 import BeautifulSoup
+
+        value = BeautifulSoup(value, "html.parser").get_text(" ")
+    return _WHITESPACE_RE.sub(" ", value).strip()
+
+
+def _experience(value):
+    if isinstance(value, dict) and value.get("monthsOfExperience"):
+        try:
+            months = float(value["monthsOfExperience"])
+        except (TypeError, ValueError):
+            return _text(value)
+        years = months / 12
+        return f"{years:g}+ years" if months % 12 == 0 else f"{months:g}+ months"
+    return _text(value)
+
+
+def _skills(posting):
+    skills = posting.get("skills")
+    if isinstance(skills, list):
+        return [s for s in map(_text, skills) if s] or NOT_SPECIFIED
+    text = _text(skills)
+    return [s.strip() for s in re.split(r"[,;\n]", text) if s.strip()] if text else NOT_SPECIFIED
+
+
+def _description(posting):
+    text = _text(posting.get("description"))
+    if len(text) > MAX_DESCRIPTION_CHARS:
+        text = text[:MAX_DESCRIPTION_CHARS].rsplit(" ", 1)[0] + "..."
+    return text
+
+
+def _to_job(posting):
+    company = posting.get("hiringOrganization")
+    return {
+        "company_name": _text(company) or NOT_SPECIFIED,
+        "role": _text(posting.get("title") or posting.get("name")) or NOT_SPECIFIED,
+        "experience": _experience(posting.get("experienceRequirements")) or NOT_SPECIFIED,
+        "skills": _skills(posting),
+        "description": _description(posting) or NOT_SPECIFIED,
+    }
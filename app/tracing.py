@@ -0,0 +1,255 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "coldmail"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Numeric span attributes that are also summed into counters, as (attribute, metric, extra labels).
+_COUNTED_ATTRS = (
+    ("input_tokens", "llm_tokens_total", {"type": "input"}),
+    ("output_tokens", "llm_tokens_total", {"type": "output"}),
+    ("prompt_chars", "llm_prompt_chars_total", {}),
+    ("texts", "embedded_texts_total", {}),
+)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        return self
+
+    def end(self, error=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "start", "_t0", "_token", "_ended")
+
+    def __init__(self, name, attrs, parent):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = None
+        self._ended = False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+    def end(self, error=None):
+        if self._ended:
+            return
+        self._ended = True
+        if error is not None:
+            self.attrs["error"] = type(error).__name__
+        _tracer.finish(self, time.perf_counter() - self._t0)
+
+
+class Metrics:
+    """Counters and per-stage latency histograms, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[0][i] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+            lines.append(f"{PREFIX}_{name}{_labels(labels)} {value}")
+        for (name, labels), (buckets, total, count) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {PREFIX}_{name} histogram")
+            for bound, n in zip(BUCKETS, buckets):
+                lines.append(f"{PREFIX}_{name}_bucket{_labels(labels + (('le', repr(bound)),))} {n}")
+            lines.append(f"{PREFIX}_{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{PREFIX}_{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{PREFIX}_{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+class Tracer:
+    """
+    Finishes spans: feeds the metrics and appends one JSON line per span to the trace file.
+
+    The process-wide tracer is enabled by TRACING=1, TRACE_FILE=<path> or METRICS_PORT=<port>.
+    When it is disabled, ``span`` returns a shared no-op object after one flag check.
+    """
+
+    def __init__(self, enabled=False, trace_file=None):
+        self.enabled = enabled
+        self.metrics = Metrics()
+        self._trace_file = None
+        self._file_lock = threading.Lock()
+        if trace_file:
+            directory = os.path.dirname(os.path.abspath(trace_file))
+            os.makedirs(directory, exist_ok=True)
+            self._trace_file = open(trace_file, "a", encoding="utf-8", buffering=1)
+
+    def finish(self, span, duration):
+        stage = {"stage": span.name}
+        self.metrics.observe("stage_duration_seconds", stage, duration)
+        if "error" in span.attrs:
+            self.metrics.inc("stage_errors_total", stage)
+        for attr, metric, extra in _COUNTED_ATTRS:
+            value = span.attrs.get(attr)
+            if isinstance(value, (int, float)):
+                self.metrics.inc(metric, dict(stage, **extra), value)
+        if self._trace_file is not None:
+            line = json.dumps({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start": span.start,
+                "duration_ms": round(duration * 1000, 3),
+                "attrs": span.attrs,
+            }, default=str)
+            with self._file_lock:
+                self._trace_file.write(line + "\n")
+
+
+_tracer = Tracer(
+    enabled=bool(os.getenv("TRACING") or os.getenv("TRACE_FILE") or os.getenv("METRICS_PORT")),
+    trace_file=os.getenv("TRACE_FILE") or None,
+)
+
+
+def configure(enabled=True, trace_file=None):
+    """Replace the process-wide tracer (e.g. from a script or benchmark)."""
+    global _tracer
+    _tracer = Tracer(enabled=enabled, trace_file=trace_file)
+    return _tracer
+
+
+def enabled():
+    return _tracer.enabled
+
+
+def span(name, **attrs):
+    """Context manager timing ``name`` as a child of the current span."""
+    if not _tracer.enabled:
+        return NOOP_SPAN
+    return Span(name, attrs, _current.get())
+
+
+def start_span(name, **attrs):
+    """A span that is not made current; call ``.end()`` yourself (e.g. around a generator)."""
+    if not _tracer.enabled:
+        return NOOP_SPAN
+    return Span(name, attrs, _current.get())
+
+
+def annotate(**attrs):
+    """Attach attributes to the current span, if any."""
+    if _tracer.enabled:
+        current = _current.get()
+        if current is not None:
+            current.attrs.update(attrs)
+
+
+def record_cache(cache, hit, count=1):
+    """Count ``count`` cache lookups and note the result on the current span."""
+    if not _tracer.enabled or not count:
+        return
+    result = "hit" if hit else "miss"
+    _tracer.metrics.inc("cache_requests_total", {"cache": cache, "result": result}, count)
+    annotate(**{f"cache.{cache}": result})
+
+
+def render_prometheus():
+    return _tracer.metrics.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=None):
+    """Serve /metrics on METRICS_PORT (once per process); returns the server or None when unset."""
+    global _server
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host or os.getenv("METRICS_HOST", "127.0.0.1"), port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
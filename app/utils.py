@@ -1,3 +1,4 @@
+import os
 import textwrap
 import re
 
@@ -8,17 +9,102 @@ def print_wrapped(text, width=100):
         wrapped_text += '\n'.join(textwrap.wrap(line, width=width)) + '\n'
     return wrapped_text
 
+def data_path(filename):
+    """
+    Absolute path of a local state file (outbox, quotas) under COLDMAIL_DATA_DIR,
+    default ~/.local/share/coldmail, rather than wherever the app was started from.
+    The directory is created owner-only since these files hold resumes and addresses.
+    """
+    directory = os.getenv("COLDMAIL_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".local", "share", "coldmail")
+    directory = os.path.abspath(directory)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, filename)
+
+# Tags and URLs are removed together in one pass.
+_MARKUP_RE = re.compile(
+    r'<[^>]*?>|http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+)
+# Two or more line breaks (possibly with spaces between) end a paragraph.
+_PARAGRAPH_BREAK_RE = re.compile(r'[ \t\r\f\v]*\n(?:[ \t\r\f\v]*\n)+\s*')
+_SPECIAL_CHARS_RE = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+def _clean_paragraphs(text):
+    paragraphs = []
+    for paragraph in _PARAGRAPH_BREAK_RE.split(_MARKUP_RE.sub('', text)):
+        # split()/join collapses every whitespace run, including single line breaks.
+        paragraph = ' '.join(_SPECIAL_CHARS_RE.sub('', paragraph).split())
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+
 def clean_text(text):
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*?>', '', text)
-    # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # Trim leading and trailing whitespace
-    text = text.strip()
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
\ No newline at end of file
+    """
+    Strip HTML tags, URLs and special characters and normalize whitespace.
+
+    Paragraph boundaries (blank lines) are kept as ``\n\n`` so callers such
+    as ``Chain.extract_jobs`` can still split the page into sections.
+    """
+    return '\n\n'.join(_clean_paragraphs(text))
+
+
+def _last_safe_break(pending):
+    """
+    The last paragraph break in ``pending`` that can be cut at without changing what
+    ``_MARKUP_RE`` would remove from the full text (or None), and whether a ``<`` is
+    still waiting for its ``>``.
+
+    A break inside a tag is not a break at all, and nothing from a ``<`` that has no
+    closing ``>`` yet (or from a URL that reaches the end of the buffer) onwards is
+    settled until more text arrives.
+    """
+    spans = [m.span() for m in _MARKUP_RE.finditer(pending)]
+    settled = len(pending)
+    if spans and spans[-1][1] == settled:
+        settled = spans[-1][0]
+    unclosed = False
+    prev = 0
+    for start, end in spans + [(len(pending), len(pending))]:
+        # Any "<" outside a match has no ">" after it; a later chunk may still close it.
+        position = pending.find('<', prev, start)
+        if position >= 0:
+            settled = min(settled, position)
+            unclosed = True
+            break
+        prev = end
+    i = len(spans) - 1
+    for match in reversed(list(_PARAGRAPH_BREAK_RE.finditer(pending, 0, settled))):
+        while i >= 0 and spans[i][0] >= match.end():
+            i -= 1
+        if i < 0 or spans[i][1] <= match.start():
+            return match, unclosed
+    return None, unclosed
+
+
+def clean_text_chunks(chunks):
+    """
+    Streaming ``clean_text`` over an iterable of text chunks.
+
+    Yields cleaned text as each paragraph completes; joining the output gives
+    the same result as ``clean_text`` on the concatenated input. Only the
+    current, unfinished paragraph is held in memory.
+    """
+    pending = ''
+    emitted = False
+    unclosed = False
+    for chunk in chunks:
+        pending += chunk
+        if unclosed and '>' not in chunk:
+            continue  # an open "<" still holds back everything after it
+        last_break, unclosed = _last_safe_break(pending)
+        if last_break is None:
+            continue
+        paragraphs = _clean_paragraphs(pending[:last_break.start()])
+        pending = pending[last_break.end():]
+        if paragraphs:
+            yield ('\n\n' if emitted else '') + '\n\n'.join(paragraphs)
+            emitted = True
+    paragraphs = _clean_paragraphs(pending)
+    if paragraphs:
+        yield ('\n\n' if emitted else '') + '\n\n'.join(paragraphs)